@@ -0,0 +1,84 @@
+"""Esquema inicial (equivalente a Base.metadata.create_all)
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "chat_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.String(255)),
+        sa.Column("device_token", sa.String(255), nullable=True),
+        sa.Column("current_step", sa.String(50)),
+        sa.Column("current_question_key", sa.String(50), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("last_activity", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_chat_sessions_id", "chat_sessions", ["id"])
+    op.create_index("ix_chat_sessions_session_id", "chat_sessions", ["session_id"], unique=True)
+
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("chat_sessions.id")),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_chat_messages_id", "chat_messages", ["id"])
+
+    op.create_table(
+        "project_briefs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("business_goal", sa.Text(), nullable=True),
+        sa.Column("audience", sa.Text(), nullable=True),
+        sa.Column("use_cases", sa.JSON(), nullable=True),
+        sa.Column("data_sources", sa.JSON(), nullable=True),
+        sa.Column("integrations", sa.JSON(), nullable=True),
+        sa.Column("constraints", sa.JSON(), nullable=True),
+        sa.Column("budget_range", sa.String(50), nullable=True),
+        sa.Column("timeline", sa.String(100), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("device_token", sa.String(255), nullable=True),
+        sa.Column("session_id", sa.String(255), nullable=True),
+    )
+    op.create_index("ix_project_briefs_id", "project_briefs", ["id"])
+
+    op.create_table(
+        "leads",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("brief_id", sa.Integer(), sa.ForeignKey("project_briefs.id"), nullable=True),
+        sa.Column("name", sa.String(255), nullable=True),
+        sa.Column("email", sa.String(255), nullable=True),
+        sa.Column("phone", sa.String(50), nullable=True),
+        sa.Column("company", sa.String(255), nullable=True),
+        sa.Column("contact_info", sa.JSON(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(50)),
+        sa.Column("priority", sa.String(20)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_leads_id", "leads", ["id"])
+
+
+def downgrade():
+    op.drop_table("leads")
+    op.drop_table("project_briefs")
+    op.drop_table("chat_messages")
+    op.drop_table("chat_sessions")
@@ -0,0 +1,37 @@
+"""Índices para las consultas frecuentes
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_hot_path_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_chat_messages_session_id_created_at", "chat_messages", ["session_id", "created_at"]
+    )
+    op.create_index(
+        "ix_chat_sessions_device_token_last_activity", "chat_sessions", ["device_token", "last_activity"]
+    )
+    op.create_index("ix_project_briefs_session_id", "project_briefs", ["session_id"])
+    op.create_index("ix_project_briefs_device_token", "project_briefs", ["device_token"])
+    op.create_index(
+        "ix_leads_status_priority_created_at", "leads", ["status", "priority", "created_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_leads_status_priority_created_at", table_name="leads")
+    op.drop_index("ix_project_briefs_device_token", table_name="project_briefs")
+    op.drop_index("ix_project_briefs_session_id", table_name="project_briefs")
+    op.drop_index("ix_chat_sessions_device_token_last_activity", table_name="chat_sessions")
+    op.drop_index("ix_chat_messages_session_id_created_at", table_name="chat_messages")
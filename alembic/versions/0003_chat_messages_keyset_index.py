@@ -0,0 +1,29 @@
+"""Incluir id en el índice de chat_messages para la paginación por keyset
+
+Revision ID: 0003_chat_messages_keyset_index
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_chat_messages_keyset_index"
+down_revision = "0002_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index("ix_chat_messages_session_id_created_at", table_name="chat_messages")
+    op.create_index(
+        "ix_chat_messages_session_id_created_at", "chat_messages", ["session_id", "created_at", "id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_chat_messages_session_id_created_at", table_name="chat_messages")
+    op.create_index(
+        "ix_chat_messages_session_id_created_at", "chat_messages", ["session_id", "created_at"]
+    )
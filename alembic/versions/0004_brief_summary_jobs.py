@@ -0,0 +1,38 @@
+"""Resumen generado en segundo plano guardado en el brief
+
+Revision ID: 0004_brief_summary_jobs
+Revises: 0003_chat_messages_keyset_index
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_brief_summary_jobs"
+down_revision = "0003_chat_messages_keyset_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("project_briefs", sa.Column("summary", sa.Text(), nullable=True))
+    op.add_column("project_briefs", sa.Column("suggestions", sa.JSON(), nullable=True))
+    op.add_column("project_briefs", sa.Column("summary_status", sa.String(20), nullable=True))
+    op.add_column("project_briefs", sa.Column("summary_job_id", sa.String(64), nullable=True))
+    op.add_column("project_briefs", sa.Column("summary_degraded", sa.Boolean(), nullable=True))
+    op.create_index("ix_project_briefs_summary_status", "project_briefs", ["summary_status"])
+    # Los workers reclaman y guardan cada resumen por su job_id
+    op.create_index("ix_project_briefs_summary_job_id", "project_briefs", ["summary_job_id"])
+
+
+def downgrade():
+    op.drop_index("ix_project_briefs_summary_job_id", table_name="project_briefs")
+    op.drop_index("ix_project_briefs_summary_status", table_name="project_briefs")
+    with op.batch_alter_table("project_briefs") as batch_op:
+        batch_op.drop_column("summary_degraded")
+        batch_op.drop_column("summary_job_id")
+        batch_op.drop_column("summary_status")
+        batch_op.drop_column("suggestions")
+        batch_op.drop_column("summary")
@@ -0,0 +1,32 @@
+"""Un único brief por sesión de chat
+
+Revision ID: 0005_unique_brief_session
+Revises: 0004_brief_summary_jobs
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0005_unique_brief_session"
+down_revision = "0004_brief_summary_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Los briefs duplicados de una sesión se desvinculan (sin borrarlos: puede haber leads
+    # apuntándolos) y la sesión conserva el más reciente, el que ya devolvía la API
+    op.execute(
+        "UPDATE project_briefs SET session_id = NULL "
+        "WHERE session_id IS NOT NULL AND id NOT IN ("
+        "SELECT MAX(id) FROM project_briefs WHERE session_id IS NOT NULL GROUP BY session_id)"
+    )
+    op.drop_index("ix_project_briefs_session_id", table_name="project_briefs")
+    op.create_index("ix_project_briefs_session_id", "project_briefs", ["session_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_project_briefs_session_id", table_name="project_briefs")
+    op.create_index("ix_project_briefs_session_id", "project_briefs", ["session_id"])
@@ -0,0 +1,109 @@
+"""
+API de administración y diagnóstico
+"""
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+import structlog
+from app.core.database import pool_metrics
+from app.core.logging import logging_stats
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+@router.get("/llm-cache")
+async def llm_cache_stats(request: Request):
+    """
+    Contadores de aciertos y fallos de la caché del LLM
+    """
+    cache = getattr(request.app.state, "llm_cache", None)
+    if cache is None:
+        return {"backend": "none", "hits": 0, "misses": 0, "hit_rate": 0.0}
+    return cache.stats()
+
+@router.get("/llm-router")
+async def llm_router_stats(request: Request):
+    """
+    Latencia p50/p95, tasa de error y estado del circuito por proveedor
+    """
+    return request.app.state.llm_router.stats()
+
+@router.get("/llm-inflight")
+async def llm_inflight_stats(request: Request):
+    """
+    Llamadas al LLM en curso y peticiones que se unieron a una ya lanzada
+    """
+    return request.app.state.chat_service.llm_service.stats()
+
+@router.get("/rate-limit")
+async def rate_limit_stats(request: Request):
+    """
+    Peticiones permitidas y rechazadas con 429
+    """
+    limiter = getattr(request.app.state, "rate_limiter", None)
+    if limiter is None:
+        return {"backend": "none", "allowed": 0, "limited": 0}
+    return limiter.stats()
+
+@router.get("/llm-scheduler")
+async def llm_scheduler_stats(request: Request):
+    """
+    Profundidad de cola, tiempos de espera y descartes por proveedor
+    """
+    return request.app.state.llm_scheduler.stats()
+
+@router.get("/summary-jobs")
+async def summary_jobs_stats(request: Request):
+    """
+    Resúmenes en cola, completados y fallidos del pool de workers
+    """
+    return request.app.state.summary_jobs.stats()
+
+@router.get("/session-state")
+async def session_state_stats(request: Request):
+    """
+    Entradas en caché y pendientes de persistir del estado de sesiones
+    """
+    return request.app.state.session_state.stats()
+
+@router.get("/context")
+async def context_stats(request: Request):
+    """
+    Sesiones con historial en memoria y presupuesto de tokens del contexto
+    """
+    return request.app.state.context_assembler.stats()
+
+@router.get("/db-pool")
+async def db_pool_stats():
+    """
+    Uso del pool de conexiones y tiempo de espera al obtener una conexión
+    """
+    return pool_metrics.stats()
+
+@router.get("/logging")
+async def logging_pipeline_stats():
+    """
+    Registros en cola, descartados por cola llena y eliminados por muestreo
+    """
+    return logging_stats()
+
+@router.get("/profiles")
+async def list_profiles(request: Request, limit: int = Query(50, ge=1, le=500)):
+    """
+    Perfiles recientes de peticiones en formato de pilas colapsadas
+    """
+    store = getattr(request.app.state, "profile_store", None)
+    if store is None:
+        return {"enabled": False, "profiles": []}
+    return {"enabled": True, "directory": store.directory, "profiles": store.recent(limit)}
+
+@router.get("/profiles/{name}")
+async def get_profile(name: str, request: Request):
+    """
+    Descargar un perfil para abrirlo con flamegraph.pl o speedscope
+    """
+    store = getattr(request.app.state, "profile_store", None)
+    path = store.path(name) if store is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -2,9 +2,8 @@
 API de autenticación y dispositivos
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, HTTPException
+from app.core.responses import model_response
 from app.schemas.chat import DeviceInitRequest, DeviceInitResponse
 import uuid
 import hashlib
@@ -14,10 +13,7 @@ logger = structlog.get_logger()
 router = APIRouter()
 
 @router.post("/device/init", response_model=DeviceInitResponse)
-async def init_device(
-    request: DeviceInitRequest,
-    db: Session = Depends(get_db)
-):
+async def init_device(request: DeviceInitRequest):
     """
     Inicializar dispositivo y generar token de sesión
     """
@@ -30,12 +26,12 @@ async def init_device(
         
         logger.info("Dispositivo inicializado", device_token=device_token)
         
-        return DeviceInitResponse(
+        return model_response(DeviceInitResponse(
             success=True,
             device_token=device_token,
             fingerprint_salt=fingerprint_salt,
             message="Dispositivo inicializado correctamente"
-        )
+        ))
         
     except Exception as e:
         logger.error("Error inicializando dispositivo", error=str(e))
@@ -3,8 +3,10 @@ API para gestión de briefs
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, upsert_insert
+from app.core.responses import model_response
 from app.schemas.brief import BriefSaveRequest, BriefSaveResponse, ProjectBriefCreate
 from app.models.brief import ProjectBrief
 import structlog
@@ -15,37 +17,47 @@ router = APIRouter()
 @router.post("/save", response_model=BriefSaveResponse)
 async def save_brief(
     request: BriefSaveRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Guardar brief del proyecto
+    
+    Con ``session_id`` se actualiza el brief de esa sesión (hay uno por sesión);
+    sin él se crea un brief nuevo.
     """
     try:
-        # Crear nuevo brief
-        brief = ProjectBrief(
-            business_goal=request.brief.business_goal,
-            audience=request.brief.audience,
-            use_cases=request.brief.use_cases,
-            data_sources=request.brief.data_sources,
-            integrations=request.brief.integrations,
-            constraints=request.brief.constraints,
-            budget_range=request.brief.budget_range,
-            timeline=request.brief.timeline,
-            device_token=request.device_token,
-            session_id=request.session_id
-        )
-        
-        db.add(brief)
-        db.commit()
-        db.refresh(brief)
+        fields = {
+            "business_goal": request.brief.business_goal,
+            "audience": request.brief.audience,
+            "use_cases": request.brief.use_cases,
+            "data_sources": request.brief.data_sources,
+            "integrations": request.brief.integrations,
+            "constraints": request.brief.constraints,
+            "budget_range": request.brief.budget_range,
+            "timeline": request.brief.timeline,
+            "device_token": request.device_token,
+        }
+        if request.session_id:
+            statement = (
+                upsert_insert(db)(ProjectBrief)
+                .values(session_id=request.session_id, **fields)
+                .on_conflict_do_update(
+                    index_elements=[ProjectBrief.session_id],
+                    set_={**fields, "updated_at": func.now()}
+                )
+            )
+        else:
+            statement = insert(ProjectBrief).values(**fields)
+        brief_id = await db.scalar(statement.returning(ProjectBrief.id))
+        await db.commit()
         
-        logger.info("Brief guardado exitosamente", brief_id=brief.id)
+        logger.info("Brief guardado exitosamente", brief_id=brief_id)
         
-        return BriefSaveResponse(
+        return model_response(BriefSaveResponse(
             success=True,
-            brief_id=brief.id,
+            brief_id=brief_id,
             message="Brief guardado exitosamente"
-        )
+        ))
         
     except Exception as e:
         logger.error("Error guardando brief", error=str(e))
@@ -55,16 +67,16 @@ async def save_brief(
         )
 
 @router.get("/{brief_id}")
-async def get_brief(brief_id: int, db: Session = Depends(get_db)):
+async def get_brief(brief_id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtener brief por ID
     """
     try:
-        brief = db.query(ProjectBrief).filter(ProjectBrief.id == brief_id).first()
+        brief = await db.get(ProjectBrief, brief_id)
         if not brief:
             raise HTTPException(status_code=404, detail="Brief no encontrado")
         
-        return brief.to_dict()
+        return model_response(brief)
         
     except HTTPException:
         raise
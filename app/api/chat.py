@@ -2,16 +2,30 @@
 API de chat con LLM
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.schemas.chat import ChatRequest, ChatResponse, ChatMessageCreate
-from app.services.chat_service import ChatService
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db, upsert_insert, AsyncSessionLocal
+from app.core.config import settings
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.core.metrics import CHAT_TURN_LATENCY
+from app.core.rate_limit import enforce_llm_turn_limit, retry_after_header
+from app.core.responses import model_response
+from app.schemas.chat import (
+    ChatRequest, ChatResponse, ChatMessageCreate, ChatHistoryResponse, ChatMessageResponse, SummaryResponse
+)
+from app.services.chat_service import ChatService, get_chat_service
+from app.services.llm_scheduler import LLMOverloadedError
+from app.services.session_state import SessionState, SessionStateCache, get_session_state_cache
+from app.services.summary_jobs import SummaryJob, SummaryJobQueue, get_summary_jobs
 from app.models.chat import ChatSession, ChatMessage
 from app.models.brief import ProjectBrief
 import uuid
+import json
+import time
 import structlog
-from datetime import datetime
+from typing import List, Optional
 
 logger = structlog.get_logger()
 router = APIRouter()
@@ -19,50 +33,59 @@ router = APIRouter()
 @router.post("/stream", response_model=ChatResponse)
 async def chat_stream(
     request: ChatRequest,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    db: AsyncSession = Depends(get_db),
+    chat_service: ChatService = Depends(get_chat_service),
+    state_cache: SessionStateCache = Depends(get_session_state_cache),
+    summary_jobs: SummaryJobQueue = Depends(get_summary_jobs)
 ):
     """
     Procesar mensaje del chat y generar respuesta del LLM
+    
+    Si el cliente envía ``Accept: text/event-stream`` la respuesta se emite
+    como Server-Sent Events a medida que el LLM genera tokens.
+    
+    Todo el turno está acotado por ``CHAT_TIMEOUT``: el LLM dispone del plazo
+    menos ``CHAT_DEADLINE_RESERVE``, que queda para persistir el turno.
+    
+    Con ``SUMMARY_MODE=background`` la última respuesta devuelve
+    ``step="summarizing"`` y un ``job_id``; el resumen se obtiene en
+    ``GET /chat/{session_id}/summary``.
     """
+    start = time.perf_counter()
+    deadline = Deadline(settings.CHAT_TIMEOUT)
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        return await _chat_event_stream(
+            request, http_request, db, chat_service, state_cache, summary_jobs, deadline, start
+        )
+    
     try:
-        # Obtener o crear sesión de chat
-        session = await get_or_create_chat_session(db, request.session_id, request.device_token)
-        
-        # Guardar mensaje del usuario
-        user_message = ChatMessage(
-            session_id=session.id,
-            role="user",
-            content=request.message
+        # Obtener estado de la sesión de chat y brief actual
+        state = await deadline.run(
+            get_chat_session_state(db, state_cache, request.session_id, request.device_token)
         )
-        db.add(user_message)
-        db.commit()
+        brief_data = await deadline.run(get_current_brief_data(db, state.session_id))
+        step = state.current_step
+        
+        # Terminar la transacción de lectura para no retener la conexión durante el LLM
+        await db.rollback()
         
-        # Obtener brief actual
-        brief_data = await get_current_brief_data(db, session.id)
+        if chat_service.triggers_llm(request.message, brief_data, state.current_step, state.current_question_key):
+            await enforce_llm_turn_limit(http_request, request.device_token)
         
         # Generar respuesta con ChatService
-        chat_service = ChatService()
-        llm_response = chat_service.process_message(
+        llm_response = await chat_service.process_message(
             user_message=request.message,
             brief_data=brief_data,
-            current_step=session.current_step,
-            current_question_key=session.current_question_key
-        )
-        
-        # Guardar respuesta del bot
-        bot_message = ChatMessage(
-            session_id=session.id,
-            role="bot",
-            content=llm_response["message"]
+            current_step=state.current_step,
+            current_question_key=state.current_question_key,
+            deadline=deadline.reserve(settings.CHAT_DEADLINE_RESERVE)
         )
-        db.add(bot_message)
-        
-        # Actualizar estado de la sesión
-        session.current_step = llm_response.get("step", session.current_step)
-        session.current_question_key = llm_response.get("current_key")
-        session.last_activity = datetime.utcnow()
         
-        db.commit()
+        # Guardar el turno en una sola transacción; el estado de la sesión se persiste por lotes
+        await deadline.run(save_chat_turn(db, state, request.message, llm_response))
+        await update_session_state(state_cache, state, llm_response)
+        schedule_summary(summary_jobs, state, brief_data, llm_response)
         
         # Preparar respuesta
         response = ChatResponse(
@@ -70,12 +93,31 @@ async def chat_stream(
             step=llm_response.get("step"),
             current_key=llm_response.get("current_key"),
             suggestions=llm_response.get("suggestions"),
-            summary=llm_response.get("summary")
+            summary=llm_response.get("summary"),
+            degraded=llm_response.get("degraded", False),
+            job_id=llm_response.get("job_id")
         )
         
-        logger.info("Respuesta de chat generada", session_id=session.session_id)
-        return response
+        CHAT_TURN_LATENCY.labels(step).observe(time.perf_counter() - start)
+        logger.info("Respuesta de chat generada", session_id=state.session_id)
+        return model_response(response)
         
+    except HTTPException:
+        raise
+    except DeadlineExceeded:
+        logger.warning("Plazo del turno de chat agotado", timeout=settings.CHAT_TIMEOUT)
+        raise HTTPException(
+            status_code=504,
+            detail="Tiempo de respuesta agotado"
+        )
+    except LLMOverloadedError as e:
+        # El resumen cae al resumen simple; solo los turnos de conversación llegan aquí
+        logger.warning("LLM saturado", error=str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Servicio saturado, intenta de nuevo en unos segundos",
+            headers=retry_after_header(1)
+        )
     except Exception as e:
         logger.error("Error procesando chat", error=str(e))
         raise HTTPException(
@@ -83,42 +125,383 @@ async def chat_stream(
             detail="Error procesando mensaje del chat"
         )
 
-async def get_or_create_chat_session(db: Session, session_id: str = None, device_token: str = None):
-    """Obtener o crear sesión de chat"""
+@router.get("/{session_id}/messages", response_model=ChatHistoryResponse)
+async def get_chat_messages(
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=settings.MAX_CHAT_HISTORY),
+    since: Optional[str] = None,
+    before: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    state_cache: SessionStateCache = Depends(get_session_state_cache)
+):
+    """
+    Obtener el historial de una sesión paginado por keyset sobre (created_at, id)
+    
+    Sin cursores devuelve los últimos ``limit`` mensajes (``MAX_CHAT_HISTORY``
+    por defecto). ``since`` devuelve los mensajes posteriores al cursor y
+    ``before`` los anteriores, siempre en orden cronológico.
+    """
+    if since and before:
+        raise HTTPException(status_code=400, detail="Usa solo uno de 'since' o 'before'")
+    
+    try:
+        cursor_id = int(since or before) if (since or before) else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    try:
+        state = await state_cache.get(session_id)
+        session_pk = state.id if state is not None else None
+        if session_pk is None:
+            session = await get_chat_session(db, session_id)
+            if not session:
+                raise HTTPException(status_code=404, detail="Sesión no encontrada")
+            session_pk = session.id
+        
+        limit = limit or settings.MAX_CHAT_HISTORY
+        messages = await get_message_page(db, session_pk, limit + 1, cursor_id, forward=bool(since))
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if not since:
+            # La página hacia atrás se lee en orden descendente
+            messages.reverse()
+        
+        page = {
+            "next_cursor": str(messages[-1].id) if messages else since,
+            "prev_cursor": str(messages[0].id) if messages and (has_more or since) else None,
+            "has_more": has_more,
+        }
+        history = ChatHistoryResponse(
+            messages=[ChatMessageResponse.model_validate(message) for message in messages],
+            **page
+        )
+        # El serializador de pydantic escribe las fechas igual en las dos rutas ("Z" en UTC)
+        return model_response(history)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error obteniendo historial", error=str(e), session_id=session_id)
+        raise HTTPException(
+            status_code=500,
+            detail="Error obteniendo historial del chat"
+        )
+
+@router.get("/{session_id}/summary", response_model=SummaryResponse)
+async def get_chat_summary(
+    session_id: str,
+    http_request: Request,
+    db: AsyncSession = Depends(get_db),
+    summary_jobs: SummaryJobQueue = Depends(get_summary_jobs)
+):
+    """
+    Obtener el resumen generado en segundo plano
+    
+    Devuelve ``status="pending"`` mientras el worker trabaja. Con
+    ``Accept: text/event-stream`` la conexión queda abierta y emite un evento
+    ``summary`` cuando el resumen está listo.
+    """
+    brief = await get_session_brief(db, session_id)
+    if brief is None or brief.summary_status is None:
+        raise HTTPException(status_code=404, detail="No hay resumen para esta sesión")
+    
+    summary = _summary_response(brief)
+    if "text/event-stream" not in http_request.headers.get("accept", ""):
+        return model_response(summary)
+    
+    # No retener la conexión mientras se espera al worker
+    await db.rollback()
+    
+    async def events():
+        current = summary
+        deadline = Deadline(settings.SUMMARY_JOB_TIMEOUT)
+        while current.status == "pending" and not deadline.expired:
+            yield _sse_event("pending", {"job_id": current.job_id})
+            # Despierta al terminar el trabajo si es de este proceso; si no, consulta cada segundo
+            await summary_jobs.wait(current.job_id, timeout=min(1.0, deadline.remaining()))
+            async with AsyncSessionLocal() as poll_db:
+                current = _summary_response(await get_session_brief(poll_db, session_id))
+        yield _sse_event("summary", current.model_dump())
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _summary_response(brief: ProjectBrief) -> SummaryResponse:
+    # "running" es el reclamo interno del worker: para el cliente sigue pendiente
+    return SummaryResponse(
+        status="pending" if brief.summary_status == "running" else brief.summary_status,
+        job_id=brief.summary_job_id,
+        summary=brief.summary,
+        suggestions=brief.suggestions,
+        degraded=bool(brief.summary_degraded)
+    )
+
+async def get_session_brief(db: AsyncSession, session_id: str) -> Optional[ProjectBrief]:
+    """Brief de la sesión (índice único en project_briefs.session_id)"""
+    return await db.scalar(
+        select(ProjectBrief).where(ProjectBrief.session_id == session_id)
+    )
+
+def schedule_summary(
+    summary_jobs: SummaryJobQueue,
+    state: SessionState,
+    brief_data: dict,
+    llm_response: dict
+):
+    """Encolar el resumen si el turno lo dejó pendiente (el brief ya está guardado)"""
+    if llm_response.get("job_id"):
+        summary_jobs.submit(SummaryJob(llm_response["job_id"], state, brief_data))
+
+async def get_message_page(
+    db: AsyncSession,
+    session_pk: int,
+    limit: int,
+    cursor_id: Optional[int] = None,
+    forward: bool = False
+) -> List[ChatMessage]:
+    """
+    Leer una página de mensajes usando el índice (session_id, created_at, id)
+    
+    ``forward`` lee hacia adelante desde el cursor; si no, hacia atrás (los
+    más recientes primero).
+    """
+    query = select(ChatMessage).where(ChatMessage.session_id == session_pk)
+    
+    if cursor_id is not None:
+        # Comparar con el created_at almacenado del cursor evita diferencias de formato
+        cursor_created_at = (
+            select(ChatMessage.created_at)
+            .where(ChatMessage.id == cursor_id, ChatMessage.session_id == session_pk)
+            .scalar_subquery()
+        )
+        if forward:
+            query = query.where(or_(
+                ChatMessage.created_at > cursor_created_at,
+                and_(ChatMessage.created_at == cursor_created_at, ChatMessage.id > cursor_id)
+            ))
+        else:
+            query = query.where(or_(
+                ChatMessage.created_at < cursor_created_at,
+                and_(ChatMessage.created_at == cursor_created_at, ChatMessage.id < cursor_id)
+            ))
+    
+    if forward:
+        query = query.order_by(ChatMessage.created_at, ChatMessage.id)
+    else:
+        query = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+    
+    result = await db.scalars(query.limit(limit))
+    return list(result)
+
+async def _chat_event_stream(
+    request: ChatRequest,
+    http_request: Request,
+    db: AsyncSession,
+    chat_service: ChatService,
+    state_cache: SessionStateCache,
+    summary_jobs: SummaryJobQueue,
+    deadline: Deadline,
+    start: float
+) -> StreamingResponse:
+    """Preparar el turno y devolver la respuesta como Server-Sent Events"""
+    try:
+        state = await deadline.run(
+            get_chat_session_state(db, state_cache, request.session_id, request.device_token)
+        )
+        brief_data = await deadline.run(get_current_brief_data(db, state.session_id))
+        step = state.current_step
+        await db.rollback()
+        
+    except DeadlineExceeded:
+        logger.warning("Plazo del turno de chat agotado", timeout=settings.CHAT_TIMEOUT)
+        raise HTTPException(
+            status_code=504,
+            detail="Tiempo de respuesta agotado"
+        )
+    except Exception as e:
+        logger.error("Error procesando chat", error=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail="Error procesando mensaje del chat"
+        )
+    
+    if chat_service.triggers_llm(request.message, brief_data, state.current_step, state.current_question_key):
+        await enforce_llm_turn_limit(http_request, request.device_token)
+    
+    async def events():
+        yield _sse_event("start", {"session_id": state.session_id})
+        
+        llm_response = None
+        try:
+            async for event in chat_service.stream_message(
+                user_message=request.message,
+                brief_data=brief_data,
+                current_step=state.current_step,
+                current_question_key=state.current_question_key,
+                deadline=deadline.reserve(settings.CHAT_DEADLINE_RESERVE)
+            ):
+                if event["event"] == "final":
+                    llm_response = event["data"]
+                else:
+                    yield _sse_event(event["event"], event["data"])
+            
+            await deadline.run(_save_stream_turn(state, request.message, llm_response))
+            await update_session_state(state_cache, state, llm_response)
+            schedule_summary(summary_jobs, state, brief_data, llm_response)
+            
+        except Exception as e:
+            logger.error("Error procesando chat", error=str(e))
+            yield _sse_event("error", {"detail": "Error procesando mensaje del chat"})
+            return
+        
+        response = ChatResponse(
+            message=llm_response["message"],
+            step=llm_response.get("step"),
+            current_key=llm_response.get("current_key"),
+            suggestions=llm_response.get("suggestions"),
+            summary=llm_response.get("summary"),
+            degraded=llm_response.get("degraded", False),
+            job_id=llm_response.get("job_id")
+        )
+        yield _sse_event("final", response.model_dump())
+        
+        CHAT_TURN_LATENCY.labels(step).observe(time.perf_counter() - start)
+        logger.info("Respuesta de chat generada", session_id=state.session_id)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse_event(event: str, data: dict) -> str:
+    """Formatear un evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _save_stream_turn(state: SessionState, user_message: str, llm_response: dict):
+    """Persistir un turno emitido como stream"""
+    # La sesión de la petición puede estar cerrada al terminar el stream
+    async with AsyncSessionLocal() as stream_db:
+        await save_chat_turn(stream_db, state, user_message, llm_response)
+
+async def save_chat_turn(db: AsyncSession, state: SessionState, user_message: str, llm_response: dict):
+    """
+    Persistir el turno completo en una única transacción
+    
+    Crea la sesión si es nueva (INSERT ... RETURNING), inserta los mensajes del
+    usuario y del bot en una sola sentencia y guarda la respuesta del brief.
+    Si algo falla no se persiste nada del turno.
+    """
+    created = state.id is None
+    try:
+        if created:
+            state.id = await db.scalar(
+                insert(ChatSession)
+                .values(
+                    session_id=state.session_id,
+                    device_token=state.device_token,
+                    current_step=state.current_step
+                )
+                .returning(ChatSession.id)
+            )
+        
+        await db.execute(insert(ChatMessage).values([
+            {"session_id": state.id, "role": "user", "content": user_message},
+            {"session_id": state.id, "role": "bot", "content": llm_response["message"]},
+        ]))
+        await save_brief_answer(db, state, llm_response.get("brief_update"))
+        await db.commit()
+    except BaseException:
+        # También si el plazo cancela la tarea a mitad de la transacción (CancelledError)
+        try:
+            await db.rollback()
+        finally:
+            if created:
+                # La sesión nueva no llegó a persistirse
+                state.id = None
+        raise
+
+async def save_brief_answer(db: AsyncSession, state: SessionState, brief_update: dict = None):
+    """
+    Guardar solo los campos del brief respondidos en este turno
+    
+    Un único upsert sobre el índice único de ``session_id``: dos turnos
+    concurrentes de la misma sesión no pueden crear dos briefs.
+    """
+    if not brief_update:
+        return
+    
+    insert_brief = upsert_insert(db)
+    await db.execute(
+        insert_brief(ProjectBrief)
+        .values(session_id=state.session_id, device_token=state.device_token, **brief_update)
+        .on_conflict_do_update(
+            index_elements=[ProjectBrief.session_id],
+            set_={**brief_update, "updated_at": func.now()}
+        )
+    )
+
+async def update_session_state(state_cache: SessionStateCache, state: SessionState, llm_response: dict):
+    """
+    Aplicar el nuevo paso de la conversación al estado de la sesión
+    
+    Solo si el paso no cambió desde que se leyó: el worker de resúmenes puede
+    haber pasado la sesión a ``done`` mientras se atendía este turno.
+    """
+    updated = await state_cache.update(
+        state,
+        current_step=llm_response.get("step", state.current_step),
+        current_question_key=llm_response.get("current_key"),
+        expected_step=state.current_step
+    )
+    if not updated:
+        logger.info("Estado de sesión cambiado durante el turno", session_id=state.session_id, step=state.current_step)
+
+async def get_chat_session_state(
+    db: AsyncSession,
+    state_cache: SessionStateCache,
+    session_id: str = None,
+    device_token: str = None
+) -> SessionState:
+    """
+    Obtener el estado de la sesión desde la caché o, si no está, de la base de datos
+    
+    Las sesiones nuevas se devuelven sin ``id``: se insertan junto con el turno.
+    """
     if session_id:
-        session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+        state = await state_cache.get(session_id)
+        if state is not None:
+            return state
+        
+        session = await get_chat_session(db, session_id)
         if session:
-            return session
+            state = SessionState.from_model(session)
+            await state_cache.remember(state)
+            return state
     
-    # Crear nueva sesión
-    new_session_id = session_id or f"session_{uuid.uuid4().hex[:16]}"
-    session = ChatSession(
-        session_id=new_session_id,
+    return SessionState(
+        id=None,
+        session_id=session_id or f"session_{uuid.uuid4().hex[:16]}",
         device_token=device_token,
         current_step="intro"
     )
-    db.add(session)
-    db.commit()
-    db.refresh(session)
-    
-    return session
 
-async def get_current_brief_data(db: Session, session_id: int) -> dict:
+async def get_chat_session(db: AsyncSession, session_id: str):
+    """Obtener sesión de chat por su identificador público"""
+    return await db.scalar(
+        select(ChatSession).where(ChatSession.session_id == session_id)
+    )
+
+async def get_current_brief_data(db: AsyncSession, session_id: str) -> dict:
     """Obtener datos actuales del brief"""
-    # Buscar brief asociado a la sesión
-    brief = db.query(ProjectBrief).filter(ProjectBrief.session_id == session_id).first()
+    brief = await get_session_brief(db, session_id)
     
     if brief:
-        return {
-            "business_goal": brief.business_goal,
-            "audience": brief.audience,
-            "use_cases": brief.use_cases or [],
-            "data_sources": brief.data_sources or [],
-            "integrations": brief.integrations or [],
-            "constraints": brief.constraints or [],
-            "budget_range": brief.budget_range,
-            "timeline": brief.timeline
-        }
+        # El estado del resumen en segundo plano permite cerrar la fase "summarizing"
+        return {**brief.brief_data(), **brief.summary_data()}
     else:
         # Retornar brief vacío si no existe
         return {
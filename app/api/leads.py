@@ -3,8 +3,9 @@ API para gestión de leads
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
+from app.core.responses import model_response
 from app.schemas.lead import LeadCreateRequest, LeadCreateResponse, LeadCreate
 from app.models.lead import Lead
 import structlog
@@ -15,7 +16,7 @@ router = APIRouter()
 @router.post("/create", response_model=LeadCreateResponse)
 async def create_lead(
     request: LeadCreateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crear nuevo lead
@@ -30,16 +31,15 @@ async def create_lead(
         )
         
         db.add(lead)
-        db.commit()
-        db.refresh(lead)
+        await db.commit()
         
         logger.info("Lead creado exitosamente", lead_id=lead.id)
         
-        return LeadCreateResponse(
+        return model_response(LeadCreateResponse(
             success=True,
             lead_id=lead.id,
             message="Lead creado exitosamente. Te contactaremos pronto."
-        )
+        ))
         
     except Exception as e:
         logger.error("Error creando lead", error=str(e))
@@ -49,16 +49,16 @@ async def create_lead(
         )
 
 @router.get("/{lead_id}")
-async def get_lead(lead_id: int, db: Session = Depends(get_db)):
+async def get_lead(lead_id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtener lead por ID
     """
     try:
-        lead = db.query(Lead).filter(Lead.id == lead_id).first()
+        lead = await db.get(Lead, lead_id)
         if not lead:
             raise HTTPException(status_code=404, detail="Lead no encontrado")
         
-        return lead.to_dict()
+        return model_response(lead)
         
     except HTTPException:
         raise
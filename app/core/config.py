@@ -2,6 +2,7 @@
 Configuración de la aplicación
 """
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from typing import List
 import os
@@ -15,6 +16,7 @@ class Settings(BaseSettings):
     # Configuración del servidor
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    WEB_CONCURRENCY: int = 1  # Workers de uvicorn (la misma variable que lee uvicorn)
     
     # CORS
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://127.0.0.1:3000,http://localhost:3001,http://127.0.0.1:3001"
@@ -26,6 +28,13 @@ class Settings(BaseSettings):
     
     # Base de datos
     DATABASE_URL: str = "sqlite:///./business_analyst.db"
+    ASYNC_DATABASE_URL: str = ""  # Vacío: se deriva de DATABASE_URL (aiosqlite / asyncpg)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # Segundos antes de reciclar una conexión
+    DB_POOL_PRE_PING: bool = True
+    DB_THREADPOOL_SIZE: int = 4  # Hilos para trabajo síncrono (migraciones)
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
@@ -40,11 +49,109 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-3.5-turbo"
     
     # Configuración por defecto del LLM
-    DEFAULT_LLM_PROVIDER: str = "groq"  # "groq" o "openai"
+    DEFAULT_LLM_PROVIDER: str = "groq"  # "groq", "openai" o "fake"
+    
+    # Proveedor falso (sin red) para ejecuciones locales y benchmarks
+    FAKE_LLM_LATENCY: float = 0.5  # Segundos hasta el primer token (mediana en lognormal)
+    FAKE_LLM_JITTER: float = 0.1  # Ancho (uniform), desviación (normal) o sigma (lognormal)
+    FAKE_LLM_LATENCY_DISTRIBUTION: str = "uniform"  # fixed, uniform, normal, lognormal o exponential
+    FAKE_LLM_TOKENS_PER_SECOND: float = 50.0  # Velocidad de generación; 0: respuesta de golpe
+    FAKE_LLM_ERROR_RATE: float = 0.0  # Fracción de llamadas que fallan
+    FAKE_LLM_TIMEOUT_RATE: float = 0.0  # Fracción de llamadas que se cuelgan y expiran
+    FAKE_LLM_TIMEOUT: float = 10.0  # Segundos que se cuelga una llamada antes de expirar
+    FAKE_LLM_RESPONSES: str = ""  # Fichero JSON con respuestas guionizadas (lista u objeto fragmento → respuesta)
+    FAKE_LLM_SEED: int = 0  # Semilla para repetir la misma secuencia; 0: aleatoria
+    
+    # Enrutado entre proveedores
+    LLM_PROVIDERS: str = ""  # Separados por comas; vacío: solo DEFAULT_LLM_PROVIDER
+    LLM_HEDGE_DELAY: float = 0.0  # Segundos antes de una segunda petición a otro proveedor; 0 desactiva
+    LLM_BREAKER_FAILURES: int = 5  # Fallos consecutivos que abren el circuito
+    LLM_BREAKER_RESET: float = 30.0  # Segundos con el circuito abierto antes de probar de nuevo
+    LLM_LATENCY_WINDOW: int = 100  # Llamadas usadas para p50/p95 y tasa de error
+    LLM_MAX_CONCURRENCY: int = 8  # Llamadas simultáneas por proveedor
+    LLM_MAX_QUEUE: int = 100  # Llamadas en espera por proveedor antes de descartar
+    LLM_SINGLE_FLIGHT: bool = True  # Compartir la llamada entre prompts idénticos en curso
+    
+    @property
+    def llm_providers_list(self) -> List[str]:
+        """Proveedores para el router, empezando por DEFAULT_LLM_PROVIDER"""
+        providers = [self.DEFAULT_LLM_PROVIDER]
+        for provider in self.LLM_PROVIDERS.split(","):
+            provider = provider.strip()
+            if provider and provider not in providers:
+                providers.append(provider)
+        return providers
+    
+    # Caché de respuestas del LLM
+    LLM_CACHE_BACKEND: str = "memory"  # "none", "memory", "sqlite" o "redis"
+    LLM_CACHE_TTL: int = 3600  # Segundos
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_SQLITE_PATH: str = "./llm_cache.db"
     
     # Configuración del chat
     MAX_CHAT_HISTORY: int = 50
-    CHAT_TIMEOUT: int = 30
+    CHAT_TIMEOUT: int = 30  # Segundos máximos por turno de chat
+    CHAT_DEADLINE_RESERVE: float = 1.0  # Segundos del plazo reservados para persistir el turno
+    LLM_CONTEXT_TOKEN_BUDGET: int = 1500  # Tokens máximos por petición al LLM (prompts e historial)
+    LLM_CONTEXT_MAX_SESSIONS: int = 1000  # Sesiones con historial en memoria
+    
+    @model_validator(mode="after")
+    def check_chat_deadline_reserve(self) -> "Settings":
+        """La reserva para persistir el turno debe dejar plazo para el LLM"""
+        if self.CHAT_DEADLINE_RESERVE >= self.CHAT_TIMEOUT:
+            raise ValueError(
+                f"CHAT_DEADLINE_RESERVE ({self.CHAT_DEADLINE_RESERVE}) debe ser menor que CHAT_TIMEOUT ({self.CHAT_TIMEOUT})"
+            )
+        return self
+    
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_ASYNC: bool = True  # Escribir los logs desde un hilo a través de una cola
+    LOG_QUEUE_SIZE: int = 10000  # Registros en cola antes de descartar
+    LOG_SAMPLING: str = ""  # "evento=fracción" separados por comas, solo para info/debug
+    
+    # Respuestas JSON serializadas con orjson sin pasar por jsonable_encoder
+    FAST_JSON_RESPONSES: bool = False
+    
+    # Métricas Prometheus en /metrics (requiere prometheus-client)
+    METRICS_ENABLED: bool = True
+    
+    # Perfilado por petición (desactivado no se instala el middleware)
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"  # Cabecera que pide perfilar la petición
+    PROFILING_SAMPLE_RATE: float = 0.0  # Fracción de peticiones perfiladas al azar
+    PROFILING_INTERVAL: float = 0.005  # Segundos entre muestras
+    PROFILING_DIR: str = "./profiles"
+    PROFILING_MAX_FILES: int = 100  # Perfiles conservados en PROFILING_DIR
+    
+    # Resumen final
+    SUMMARY_MODE: str = "sync"  # "sync" o "background"
+    SUMMARY_WORKERS: int = 4  # Workers que generan resúmenes en segundo plano
+    SUMMARY_JOB_TIMEOUT: int = 120  # Segundos máximos por resumen en segundo plano
+    
+    # Rate limiting con token buckets (tokens por segundo y capacidad)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" o "redis"
+    RATE_LIMIT_PATHS: str = "/chat/stream"  # Prefijos limitados, separados por comas
+    RATE_LIMIT_DEVICE_RATE: float = 0.5
+    RATE_LIMIT_DEVICE_BURST: int = 20
+    RATE_LIMIT_IP_RATE: float = 2.0
+    RATE_LIMIT_IP_BURST: int = 60
+    RATE_LIMIT_LLM_RATE: float = 0.02  # Turnos que generan el resumen con el LLM
+    RATE_LIMIT_LLM_BURST: int = 3
+    RATE_LIMIT_MAX_KEYS: int = 100000  # Buckets en memoria
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # Usar X-Forwarded-For detrás de un proxy
+    
+    @property
+    def rate_limit_paths_list(self) -> List[str]:
+        """Convertir RATE_LIMIT_PATHS string a lista"""
+        return [path.strip() for path in self.RATE_LIMIT_PATHS.split(",") if path.strip()]
+    
+    # Estado de sesiones con escritura diferida
+    SESSION_STATE_BACKEND: str = "memory"  # "memory" o "redis"
+    SESSION_STATE_FLUSH_INTERVAL: float = 2.0  # Segundos entre escrituras por lotes
+    SESSION_STATE_MAX_ENTRIES: int = 10000
+    SESSION_STATE_TTL: int = 86400  # Segundos, solo para redis
     
     # Configuración de autenticación
     SECRET_KEY: str = "your-secret-key-change-in-production"
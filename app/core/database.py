@@ -2,27 +2,128 @@
 Configuración de la base de datos
 """
 
-from sqlalchemy import create_engine
+import time
+from anyio import CapacityLimiter, to_thread
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-# Crear engine de SQLAlchemy
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+def get_async_database_url(url: str) -> str:
+    """Seleccionar el driver asíncrono para la URL configurada"""
+    if url.startswith("sqlite:///"):
+        return "sqlite+aiosqlite:///" + url[len("sqlite:///"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+class PoolMetrics:
+    """Métricas de uso del pool para dimensionarlo bajo concurrencia"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+
+    def on_checkout(self, *args):
+        self.checkouts += 1
+        self.checked_out += 1
+        self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def on_checkin(self, *args):
+        self.checked_out = max(self.checked_out - 1, 0)
+
+    def stats(self) -> dict:
+        pool = engine.sync_engine.pool
+        return {
+            "pool": pool.status(),
+            "pool_size": pool.size() if hasattr(pool, "size") else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "checkouts": self.checkouts,
+            "checked_out": self.checked_out,
+            "max_checked_out": self.max_checked_out,
+            "avg_wait_ms": round(self.total_wait / self.waits * 1000, 3) if self.waits else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+pool_metrics = PoolMetrics()
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool que mide cuánto espera cada checkout, venga de donde venga la sesión"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+def _engine_options(url: str) -> dict:
+    """Opciones del pool a partir de la configuración"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    # SQLite en memoria usa un pool estático sin tamaño configurable
+    if ":memory:" in url:
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    # SQLite admite un solo escritor: con varias conexiones las transacciones que leen
+    # y luego escriben fallan con "database is locked", así que se espera en el pool
+    if url.startswith("sqlite"):
+        options.update(pool_size=1, max_overflow=0)
+    return options
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+
+# Crear engine asíncrono de SQLAlchemy
+engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
 
 # Crear sesión de base de datos
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base para los modelos
 Base = declarative_base()
 
-def get_db():
-    """Dependency para obtener la sesión de base de datos"""
-    db = SessionLocal()
-    try:
+event.listen(engine.sync_engine.pool, "checkout", pool_metrics.on_checkout)
+event.listen(engine.sync_engine.pool, "checkin", pool_metrics.on_checkin)
+
+def upsert_insert(db: AsyncSession):
+    """``insert`` del dialecto de la sesión, que admite ``on_conflict_do_update``"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise ValueError(f"Upsert no soportado para el dialecto: {dialect}")
+
+async def get_db():
+    """Dependency para obtener la sesión asíncrona de base de datos"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# Limitador de hilos para el trabajo síncrono de base de datos (migraciones)
+_db_limiter = None
+
+async def run_in_db_thread(func, *args):
+    """Ejecutar trabajo síncrono de base de datos sin bloquear el event loop"""
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = CapacityLimiter(settings.DB_THREADPOOL_SIZE)
+    return await to_thread.run_sync(func, *args, limiter=_db_limiter)
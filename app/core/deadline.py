@@ -0,0 +1,48 @@
+"""
+Plazos por petición
+Acotan el tiempo de las llamadas al LLM y a la base de datos de un turno de chat
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Optional
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Se agotó el tiempo disponible para la petición"""
+
+class Deadline:
+    """Instante límite de una petición, medido con reloj monotónico"""
+
+    def __init__(self, timeout: float, expires_at: Optional[float] = None):
+        self.timeout = timeout
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Segundos que quedan hasta el límite"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """Plazo que termina ``seconds`` antes, para dejar tiempo a lo que sigue"""
+        return Deadline(self.timeout, self.expires_at - seconds)
+
+    async def run(self, awaitable: Awaitable[Any]) -> Any:
+        """Esperar ``awaitable`` como mucho hasta el límite"""
+        budget = self.remaining()
+        if budget <= 0:
+            if hasattr(awaitable, "close"):
+                awaitable.close()
+            raise DeadlineExceeded("Plazo agotado antes de empezar")
+        try:
+            return await asyncio.wait_for(awaitable, budget)
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded(f"Plazo de {self.timeout}s agotado") from e
+
+async def run_within(deadline: Optional[Deadline], awaitable: Awaitable[Any]) -> Any:
+    """Esperar ``awaitable`` respetando el plazo si lo hay"""
+    if deadline is None:
+        return await awaitable
+    return await deadline.run(awaitable)
@@ -1,18 +1,111 @@
 """
 Configuración de logging
+Los logs se renderizan en JSON y se escriben desde un hilo aparte a través de una cola acotada
 """
 
-import structlog
+import atexit
 import logging
+import queue
+import random
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, TextIO
+import structlog
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_listener: Optional["BlockingStopQueueListener"] = None
+_handler: Optional["DroppingQueueHandler"] = None
+_sampler: Optional["EventSampler"] = None
+
+def _orjson_dumps(obj: Any, default=None, **kwargs) -> str:
+    return orjson.dumps(obj, default=default).decode("utf-8")
+
+def json_renderer() -> structlog.processors.JSONRenderer:
+    """Renderer JSON con orjson si está instalado"""
+    if orjson is not None:
+        return structlog.processors.JSONRenderer(serializer=_orjson_dumps)
+    return structlog.processors.JSONRenderer()
+
+class EventSampler:
+    """Procesador de structlog que conserva una fracción de los eventos configurados
+
+    Solo afecta a ``debug`` e ``info``: los avisos y errores se registran siempre.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        self.rates = rates
+        self.dropped: Dict[str, int] = {}
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if method_name in ("debug", "info"):
+            rate = self.rates.get(event_dict.get("event"))
+            if rate is not None and random.random() >= rate:
+                event = event_dict["event"]
+                self.dropped[event] = self.dropped.get(event, 0) + 1
+                raise structlog.DropEvent
+        return event_dict
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """Convertir ``evento=fracción`` separados por comas en un diccionario"""
+    rates = {}
+    for item in value.split(","):
+        event, sep, rate = item.rpartition("=")
+        if sep and event.strip():
+            rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que descarta y cuenta los registros cuando la cola está llena"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
 
-def setup_logging():
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # structlog ya entrega el mensaje renderizado: se evita copiar el registro
+        record.msg = self.format(record)
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BlockingStopQueueListener(QueueListener):
+    """QueueListener que espera hueco en la cola para el centinela de parada"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+def setup_logging(
+    async_mode: Optional[bool] = None,
+    stream: Optional[TextIO] = None,
+    sampling: Optional[str] = None
+):
     """Configurar el sistema de logging"""
-    
+    global _listener, _handler, _sampler
+    async_mode = settings.LOG_ASYNC if async_mode is None else async_mode
+    sampling = settings.LOG_SAMPLING if sampling is None else sampling
+    stream = stream or sys.stdout
+
+    shutdown_logging()
+    structlog.reset_defaults()
+    _sampler = EventSampler(parse_sampling(sampling))
+
     # Configurar structlog
     structlog.configure(
         processors=[
             structlog.stdlib.filter_by_level,
+            _sampler,
             structlog.stdlib.add_logger_name,
             structlog.stdlib.add_log_level,
             structlog.stdlib.PositionalArgumentsFormatter(),
@@ -20,17 +113,51 @@ def setup_logging():
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
+            json_renderer()
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
-    
-    # Configurar logging estándar
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=logging.INFO,
-    )
+
+    # El JSON no incluye fichero, línea, hilo ni proceso: no calcularlos en cada LogRecord
+    # (optimizaciones documentadas en el HOWTO de logging)
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    # Configurar logging estándar: la escritura en el stream se hace en el hilo del listener
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logging.Formatter("%(message)s"))
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL.upper())
+    if async_mode:
+        _handler = DroppingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+        _handler.setFormatter(logging.Formatter("%(message)s"))
+        _listener = BlockingStopQueueListener(_handler.queue, output)
+        _listener.start()
+        root.handlers = [_handler]
+    else:
+        _handler = None
+        root.handlers = [output]
+
+def shutdown_logging():
+    """Vaciar la cola de logs y detener el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
+def logging_stats() -> Dict[str, Any]:
+    return {
+        "async": _listener is not None,
+        "renderer": "orjson" if orjson is not None else "json",
+        "queued": _handler.queue.qsize() if _handler is not None else 0,
+        "queue_size": _handler.queue.maxsize if _handler is not None else 0,
+        "dropped": _handler.dropped if _handler is not None else 0,
+        "sampled_out": dict(_sampler.dropped) if _sampler is not None else {},
+    }
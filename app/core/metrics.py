@@ -0,0 +1,172 @@
+"""
+Métricas Prometheus
+Latencia HTTP por ruta y paso del chat, llamadas al LLM, sentencias SQL y respaldos del resumen
+
+Con varios workers de uvicorn hay que exportar ``PROMETHEUS_MULTIPROC_DIR``
+(un directorio vacío) antes de arrancar: cada proceso escribe sus valores
+ahí y ``/metrics`` los agrega.
+"""
+
+import os
+import time
+from typing import Any, Dict, Tuple
+from app.core.config import settings
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+def metrics_enabled() -> bool:
+    return settings.METRICS_ENABLED and prometheus_client is not None
+
+class _NoopMetric:
+    """Métrica vacía cuando prometheus_client no está instalado o las métricas están desactivadas"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, value: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+_NOOP = _NoopMetric()
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+def _histogram(name: str, documentation: str, labels, buckets):
+    if not metrics_enabled():
+        return _NOOP
+    return prometheus_client.Histogram(name, documentation, labels, buckets=buckets)
+
+def _counter(name: str, documentation: str, labels):
+    if not metrics_enabled():
+        return _NOOP
+    return prometheus_client.Counter(name, documentation, labels)
+
+def _gauge(name: str, documentation: str):
+    if not metrics_enabled():
+        return _NOOP
+    # livesum: suma de los procesos vivos en modo multiproceso
+    return prometheus_client.Gauge(name, documentation, multiprocess_mode="livesum")
+
+HTTP_LATENCY = _histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ["method", "route", "status"], _LATENCY_BUCKETS
+)
+CHAT_TURN_LATENCY = _histogram(
+    "chat_turn_duration_seconds", "Latencia de un turno de chat por paso de la conversación", ["step"], _LATENCY_BUCKETS
+)
+LLM_LATENCY = _histogram(
+    "llm_request_duration_seconds", "Latencia de las llamadas al proveedor LLM", ["provider", "model", "outcome"], _LLM_BUCKETS
+)
+LLM_PROMPT_TOKENS = _counter("llm_prompt_tokens_total", "Tokens de entrada enviados al LLM", ["provider", "model"])
+LLM_COMPLETION_TOKENS = _counter("llm_completion_tokens_total", "Tokens generados por el LLM", ["provider", "model"])
+DB_LATENCY = _histogram(
+    "db_statement_duration_seconds", "Latencia de las sentencias SQL", ["operation"], _DB_BUCKETS
+)
+ACTIVE_SESSIONS = _gauge("chat_active_sessions", "Sesiones de chat con estado en memoria")
+SUMMARY_FALLBACKS = _counter(
+    "chat_summary_fallbacks_total", "Resúmenes completados con el respaldo sin LLM", ["part"]
+)
+
+def token_usage(response: Any) -> Tuple[int, int]:
+    """Tokens de entrada y salida de una respuesta de LangChain, si el proveedor los informa"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    metadata = getattr(response, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+def observe_llm_call(provider: str, model: str, seconds: float, response: Any = None, outcome: str = "ok"):
+    """Registrar la duración y los tokens de una llamada al proveedor"""
+    LLM_LATENCY.labels(provider, model, outcome).observe(seconds)
+    if response is not None:
+        prompt_tokens, completion_tokens = token_usage(response)
+        if prompt_tokens:
+            LLM_PROMPT_TOKENS.labels(provider, model).inc(prompt_tokens)
+        if completion_tokens:
+            LLM_COMPLETION_TOKENS.labels(provider, model).inc(completion_tokens)
+
+def instrument_engine(engine):
+    """Medir la duración de cada sentencia SQL del engine"""
+    if not metrics_enabled():
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        if start is not None:
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement else "OTHER"
+            DB_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+def render() -> Tuple[bytes, str]:
+    """Exposición en formato texto de Prometheus, agregando procesos si hace falta"""
+    if not metrics_enabled():
+        return b"", "text/plain; charset=utf-8"
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide la latencia por plantilla de ruta
+
+    La etiqueta ``route`` es la ruta declarada (``/chat/{session_id}/messages``),
+    no la URL, para no crear una serie por sesión.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+
+    def _route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        template = self._routes.get(endpoint)
+        if template is None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    template = route.path
+                    break
+            else:
+                template = "unmatched"
+            self._routes[endpoint] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_LATENCY.labels(scope["method"], self._route_template(scope), str(status)).observe(
+                time.perf_counter() - start
+            )
@@ -0,0 +1,39 @@
+"""
+Migraciones de base de datos con Alembic
+"""
+
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, pool
+import structlog
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Revisión equivalente al esquema que creaba Base.metadata.create_all
+BASELINE_REVISION = "0001_baseline"
+
+def get_alembic_config() -> Config:
+    """Configuración de Alembic independiente del directorio de trabajo"""
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    return config
+
+def run_migrations():
+    """Aplicar las migraciones pendientes hasta la última revisión"""
+    config = get_alembic_config()
+    
+    # Bases de datos creadas con create_all: marcar el esquema inicial como aplicado
+    engine = create_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    try:
+        tables = set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+    if "chat_sessions" in tables and "alembic_version" not in tables:
+        logger.info("Marcando esquema existente como migrado", revision=BASELINE_REVISION)
+        command.stamp(config, BASELINE_REVISION)
+    
+    command.upgrade(config, "head")
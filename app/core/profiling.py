@@ -0,0 +1,283 @@
+"""
+Perfilado opcional por petición
+Muestrea la pila de las tareas de una petición y guarda un perfil en formato
+de pilas colapsadas (``.folded``), que leen flamegraph.pl y speedscope
+"""
+
+import asyncio
+import contextvars
+import gc
+import os
+import random
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+import structlog
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+_PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+# Objetos que deja ``async for`` (asend/athrow) o ``await`` sobre ``__await__`` sin atributo público al generador
+_AWAIT_WRAPPERS = ("async_generator_asend", "async_generator_athrow", "coroutine_wrapper")
+_PATH_PREFIXES = ("site-packages" + os.sep, os.getcwd() + os.sep, sysconfig.get_paths()["stdlib"] + os.sep)
+
+# Muestreador de la petición perfilada; las tareas lo heredan al crearse
+_active_sampler: contextvars.ContextVar[Optional["_TaskSampler"]] = contextvars.ContextVar(
+    "active_sampler", default=None
+)
+
+class _TaskSampler(threading.Thread):
+    """Hilo que toma muestras de la pila de las tareas asyncio de una petición
+
+    Se muestrea la tarea de la petición y todas las que se crean desde ella
+    (el body de un StreamingResponse, las llamadas en paralelo al LLM...), que
+    registra la task factory de ``_install_task_factory``. De la tarea que se
+    está ejecutando se lee la pila del hilo del event loop; de las suspendidas
+    se recorre la cadena de ``await`` de su corrutina y la hoja indica lo que
+    esperan (respuesta del proveedor, base de datos, cola...).
+    """
+
+    def __init__(self, task: asyncio.Task, loop_thread_id: int, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.task = task
+        self.tasks: List[asyncio.Task] = [task]
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if self.task.done():
+                break
+            for stack in self._sample():
+                self.samples[";".join(stack)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def _sample(self) -> List[List[str]]:
+        """Una pila por cada tarea viva de la petición"""
+        # La copia de la lista es atómica aunque el event loop añada tareas a la vez
+        tasks = [task for task in self.tasks[:] if not task.done()]
+        running = asyncio.current_task(self.task.get_loop())
+        sampled = set(tasks)
+        stacks = []
+        for task in tasks:
+            stack = self._task_stack(task, task is running, sampled)
+            if stack:
+                stacks.append(stack)
+        return stacks
+
+    def _task_stack(self, task: asyncio.Task, running: bool, sampled: Set[asyncio.Task]) -> List[str]:
+        # wait_for sobre ``__anext__()`` crea la tarea directamente sobre el asend
+        coro = _unwrap(task.get_coro())
+        root = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None) \
+            or getattr(coro, "gi_frame", None)
+        if root is None:
+            return []
+        if running:
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                if frame is root:
+                    return stack[::-1]
+                frame = frame.f_back
+            # El loop cambió de tarea mientras se leía la pila
+        return _awaiting_stack(coro, sampled)
+
+def _install_task_factory(loop: asyncio.AbstractEventLoop):
+    """Registrar en el muestreador activo las tareas creadas durante una petición perfilada
+
+    Se instala en el primer perfil y conserva la task factory anterior; para
+    el resto de tareas solo añade la lectura de una ContextVar.
+    """
+    previous = loop.get_task_factory()
+    if getattr(previous, "registers_profiled_tasks", False):
+        return
+
+    def factory(loop, coro, context=None):
+        if previous is None:
+            task = asyncio.Task(coro, loop=loop, context=context)
+        elif context is None:
+            task = previous(loop, coro)
+        else:
+            task = previous(loop, coro, context=context)
+        sampler = context.get(_active_sampler) if context is not None else _active_sampler.get()
+        if sampler is not None:
+            sampler.tasks.append(task)
+            # Un stream crea una tarea por token: se quitan al terminar para no recorrerlas en cada muestra
+            task.add_done_callback(sampler.tasks.remove)
+        return task
+
+    factory.registers_profiled_tasks = True
+    loop.set_task_factory(factory)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+def _short_path(filename: str) -> str:
+    for marker in _PATH_PREFIXES:
+        index = filename.find(marker)
+        if index >= 0:
+            return filename[index + len(marker):]
+    return filename
+
+def _unwrap(awaitable):
+    """Generador o corrutina dentro de un objeto de ``_AWAIT_WRAPPERS``; si no, el propio objeto"""
+    if type(awaitable).__name__ in _AWAIT_WRAPPERS:
+        # No exponen lo que envuelven, pero gc.get_referents lo devuelve
+        for referent in gc.get_referents(awaitable):
+            if hasattr(referent, "ag_frame") or hasattr(referent, "cr_frame"):
+                return referent
+    return awaitable
+
+def _awaiting_stack(coro, sampled: Set[asyncio.Task]) -> List[str]:
+    """Pila de una corrutina suspendida siguiendo ``cr_await``
+
+    No se entra en las tareas de ``sampled``, que ya tienen su propia pila.
+    """
+    stack = []
+    awaitable = coro
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None) \
+            or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            if isinstance(awaitable, asyncio.Task) and awaitable in sampled:
+                stack.append("[await Task]")
+                break
+            if isinstance(awaitable, asyncio.Task):
+                # Tarea esperada (por ejemplo la llamada compartida al LLM): seguir en su corrutina
+                awaitable = awaitable.get_coro()
+                continue
+            inner = _unwrap(awaitable)
+            if inner is not awaitable:
+                awaitable = inner
+                continue
+            # Future de asyncio (su iterador se llama FutureIter) u otro objeto esperable
+            stack.append(f"[await {type(awaitable).__name__.replace('FutureIter', 'Future')}]")
+            break
+        stack.append(_frame_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "ag_await", None) \
+            or getattr(awaitable, "gi_yieldfrom", None)
+    return stack
+
+class ProfileStore:
+    """Directorio de perfiles; conserva solo los ``max_files`` más recientes"""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def write(self, name: str, samples: Counter) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self._prune()
+        return path
+
+    def _files(self) -> List[Tuple[float, str]]:
+        if not os.path.isdir(self.directory):
+            return []
+        files = []
+        for name in os.listdir(self.directory):
+            if _PROFILE_NAME.match(name):
+                path = os.path.join(self.directory, name)
+                files.append((os.path.getmtime(path), name))
+        return sorted(files, reverse=True)
+
+    def _prune(self):
+        for _, name in self._files()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        profiles = []
+        for mtime, name in self._files()[:limit]:
+            path = os.path.join(self.directory, name)
+            profiles.append({
+                "name": name,
+                "created_at": datetime.utcfromtimestamp(mtime).isoformat(),
+                "size": os.path.getsize(path),
+            })
+        return profiles
+
+    def path(self, name: str) -> Optional[str]:
+        """Ruta de un perfil existente; None si el nombre no es válido"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+def create_profile_store() -> ProfileStore:
+    return ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
+
+class ProfilingMiddleware:
+    """Middleware ASGI que perfila las peticiones marcadas o muestreadas
+
+    Se perfila una petición si trae la cabecera ``PROFILING_HEADER`` o al azar
+    con probabilidad ``PROFILING_SAMPLE_RATE``. Solo se instala con
+    ``PROFILING_ENABLED``, así que desactivado no añade ningún coste.
+    """
+
+    def __init__(self, app, store: ProfileStore, header: str, sample_rate: float,
+                 interval: float, max_active: int = 4):
+        self.app = app
+        self.store = store
+        self.header = header.lower().encode("latin-1")
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_active = max_active
+        self.active = 0
+
+    def _wanted(self, scope) -> bool:
+        if self.active >= self.max_active:
+            return False
+        for name, value in scope.get("headers", []):
+            if name == self.header and value not in (b"", b"0", b"false"):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        _install_task_factory(asyncio.get_running_loop())
+        sampler = _TaskSampler(asyncio.current_task(), threading.get_ident(), self.interval)
+        token = _active_sampler.set(sampler)
+        self.active += 1
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - start
+            _active_sampler.reset(token)
+            sampler.stop()
+            self.active -= 1
+            await self._save(scope, sampler.samples, elapsed)
+
+    async def _save(self, scope, samples: Counter, elapsed: float):
+        if not samples:
+            return
+        route = re.sub(r"[^\w-]+", "_", scope["path"]).strip("_") or "root"
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{scope['method']}_{route}_{int(elapsed * 1000)}ms.folded"
+        try:
+            path = await asyncio.get_running_loop().run_in_executor(None, self.store.write, name, samples)
+            logger.info("Perfil guardado", path=path, samples=sum(samples.values()), duration=round(elapsed, 3))
+        except OSError as e:
+            logger.error("Error guardando perfil", error=str(e))
@@ -0,0 +1,274 @@
+"""
+Limitación de velocidad con token buckets
+Límites por device_token y por IP en el middleware, y por turnos que llaman al LLM
+"""
+
+import json
+import math
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException, Request
+import structlog
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+class Limit(NamedTuple):
+    """Tokens repuestos por segundo y capacidad del bucket"""
+    rate: float
+    burst: int
+
+class MemoryRateLimitBackend:
+    """Buckets en memoria del proceso
+
+    No usa locks: ``take`` no cede el event loop entre la lectura y la
+    escritura del bucket, así que es atómico dentro del proceso.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # clave -> (tokens, instante de la última actualización, instante en que vuelve a estar lleno)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Consumir ``cost`` tokens; devuelve 0 si se permite o los segundos hasta poder reintentar"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            tokens = float(limit.burst)
+        else:
+            tokens = min(float(limit.burst), bucket[0] + (now - bucket[1]) * limit.rate)
+
+        retry_after = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / limit.rate
+        self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+        return retry_after
+
+    def _prune(self, now: float):
+        """Descartar los buckets llenos y, si no basta, los más antiguos"""
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+        excess = len(self._buckets) - self.max_keys + 1
+        if excess > 0:
+            for key in list(self._buckets)[:excess]:
+                del self._buckets[key]
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "buckets": len(self._buckets)}
+
+# Lectura, reposición y consumo del bucket en una sola operación atómica de Redis
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+class RedisRateLimitBackend:
+    """Buckets compartidos entre workers en Redis mediante un script Lua"""
+
+    backend = "redis"
+
+    def __init__(self, url: str, prefix: str = "rate_limit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ValueError("El backend redis de rate limiting requiere el paquete 'redis'")
+        self.prefix = prefix
+        self._client = redis.from_url(url, decode_responses=True)
+        self._script = self._client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        retry_after = await self._script(keys=[self.prefix + key], args=[limit.rate, limit.burst, cost])
+        return float(retry_after)
+
+    async def close(self):
+        await self._client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend}
+
+class RateLimiter:
+    """Límites de la API sobre un backend de token buckets"""
+
+    def __init__(self, backend, device: Limit, ip: Limit, llm: Limit):
+        self.backend = backend
+        self.device = device
+        self.ip = ip
+        self.llm = llm
+        self.allowed = 0
+        self.limited = 0
+
+    async def _take(self, key: str, limit: Limit) -> float:
+        try:
+            return await self.backend.take(key, limit)
+        except Exception as e:
+            # Si el backend falla se deja pasar la petición
+            logger.error("Error en el backend de rate limiting", error=str(e))
+            return 0.0
+
+    def _count(self, retry_after: float) -> float:
+        if retry_after > 0:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    async def check_request(self, ip: Optional[str], device_token: Optional[str]) -> float:
+        """Aplicar los límites por IP y por dispositivo a una petición"""
+        retry_after = 0.0
+        if ip:
+            retry_after = await self._take(f"ip:{ip}", self.ip)
+        if device_token and not retry_after:
+            retry_after = await self._take(f"device:{device_token}", self.device)
+        return self._count(retry_after)
+
+    async def check_llm_turn(self, client_key: str) -> float:
+        """Aplicar el límite de turnos que llaman al LLM"""
+        return self._count(await self._take(f"llm:{client_key}", self.llm))
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.backend.stats(),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+def create_rate_limiter(backend: Optional[str] = None) -> RateLimiter:
+    """Crear el limitador configurado en RATE_LIMIT_BACKEND"""
+    backend = backend or settings.RATE_LIMIT_BACKEND
+    if backend == "memory":
+        store = MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    elif backend == "redis":
+        store = RedisRateLimitBackend(settings.REDIS_URL)
+    else:
+        raise ValueError(f"Backend de rate limiting no soportado: {backend}")
+    return RateLimiter(
+        store,
+        device=Limit(settings.RATE_LIMIT_DEVICE_RATE, settings.RATE_LIMIT_DEVICE_BURST),
+        ip=Limit(settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST),
+        llm=Limit(settings.RATE_LIMIT_LLM_RATE, settings.RATE_LIMIT_LLM_BURST)
+    )
+
+def client_ip(scope: Dict[str, Any]) -> Optional[str]:
+    """IP del cliente, tomando X-Forwarded-For solo si se confía en el proxy"""
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+def retry_after_header(retry_after: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+class RateLimitMiddleware:
+    """Middleware ASGI que aplica los límites por IP y device_token
+
+    El device_token se toma de la cabecera ``X-Device-Token`` o, si no está,
+    del campo ``device_token`` del cuerpo JSON, que se vuelve a entregar
+    intacto a la aplicación.
+    """
+
+    def __init__(self, app, paths: List[str]):
+        self.app = app
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        limiter: Optional[RateLimiter] = getattr(scope["app"].state, "rate_limiter", None)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        device_token = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-device-token":
+                device_token = value.decode("latin-1")
+                break
+
+        if device_token is None:
+            messages = []
+            body = b""
+            while True:
+                message = await receive()
+                messages.append(message)
+                if message["type"] != "http.request":
+                    break
+                body += message.get("body", b"")
+                if not message.get("more_body", False):
+                    break
+            device_token = _device_token_from_body(body)
+
+            async def replay():
+                return messages.pop(0) if messages else await receive()
+        else:
+            replay = receive
+
+        retry_after = await limiter.check_request(client_ip(scope), device_token)
+        if retry_after > 0:
+            logger.warning("Petición limitada", path=scope["path"], device_token=device_token)
+            await _send_429(send, retry_after)
+            return
+
+        await self.app(scope, replay, send)
+
+def _device_token_from_body(body: bytes) -> Optional[str]:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    token = data.get("device_token") if isinstance(data, dict) else None
+    return token if isinstance(token, str) else None
+
+async def _send_429(send, retry_after: float):
+    body = json.dumps({"detail": "Demasiadas peticiones"}).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers += [(name.lower().encode(), value.encode()) for name, value in retry_after_header(retry_after).items()]
+    await send({"type": "http.response.start", "status": 429, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+async def enforce_llm_turn_limit(request: Request, device_token: Optional[str]):
+    """Lanzar 429 si el cliente superó el límite de turnos que llaman al LLM"""
+    limiter: Optional[RateLimiter] = getattr(request.app.state, "rate_limiter", None)
+    if limiter is None:
+        return
+    client_key = device_token or client_ip(request.scope) or "anonymous"
+    retry_after = await limiter.check_llm_turn(client_key)
+    if retry_after > 0:
+        logger.warning("Turno LLM limitado", client=client_key)
+        raise HTTPException(
+            status_code=429,
+            detail="Demasiadas generaciones de resumen, intenta más tarde",
+            headers=retry_after_header(retry_after)
+        )
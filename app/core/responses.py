@@ -0,0 +1,60 @@
+"""
+Serialización JSON rápida de las respuestas
+Con FAST_JSON_RESPONSES los endpoints envían bytes ya serializados con orjson
+y FastAPI no vuelve a validar ni a recorrer el objeto con jsonable_encoder
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Dict
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable en JSON: {type(value).__name__}")
+
+def dumps(value: Any) -> bytes:
+    """Serializar a JSON; orjson codifica las fechas sin pasar por isoformat"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def isoformat_dates(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Copia de ``fields`` con las fechas como texto ISO 8601"""
+    return {key: value.isoformat() if isinstance(value, (datetime, date)) else value for key, value in fields.items()}
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con orjson y acepta bytes ya serializados"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
+
+class JSONModel(BaseModel):
+    """Esquema de respuesta que se serializa directamente a bytes"""
+
+    def to_json(self) -> bytes:
+        return self.__pydantic_serializer__.to_json(self)
+
+def default_response_class():
+    return FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse
+
+def model_response(obj: Any) -> Any:
+    """
+    Respuesta de un modelo ORM o un esquema ``JSONModel``
+
+    Con FAST_JSON_RESPONSES se envían los bytes de ``obj.to_json()``; si no,
+    ``obj.to_dict()`` en los modelos ORM o el propio esquema, como antes.
+    """
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(obj.to_json())
+    return obj.to_dict() if hasattr(obj, "to_dict") else obj
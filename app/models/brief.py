@@ -2,9 +2,10 @@
 Modelo de Brief del proyecto
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.responses import dumps, isoformat_dates
 
 class ProjectBrief(Base):
     __tablename__ = "project_briefs"
@@ -19,16 +20,45 @@ class ProjectBrief(Base):
     budget_range = Column(String(50), nullable=True)
     timeline = Column(String(100), nullable=True)
     
+    # Resumen generado en segundo plano
+    summary = Column(Text, nullable=True)
+    suggestions = Column(JSON, nullable=True)  # Lista de strings
+    summary_status = Column(String(20), nullable=True, index=True)  # "pending", "running" o "done"
+    summary_job_id = Column(String(64), nullable=True, index=True)
+    summary_degraded = Column(Boolean, nullable=True)
+    
     # Metadatos
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Información del dispositivo/sesión
-    device_token = Column(String(255), nullable=True)
-    session_id = Column(String(255), nullable=True)
+    device_token = Column(String(255), nullable=True, index=True)
+    session_id = Column(String(255), nullable=True, unique=True, index=True)  # ChatSession.session_id, un brief por sesión
     
-    def to_dict(self):
-        """Convertir a diccionario"""
+    def brief_data(self):
+        """Respuestas del brief en el formato que usa ChatService"""
+        return {
+            "business_goal": self.business_goal,
+            "audience": self.audience,
+            "use_cases": self.use_cases or [],
+            "data_sources": self.data_sources or [],
+            "integrations": self.integrations or [],
+            "constraints": self.constraints or [],
+            "budget_range": self.budget_range,
+            "timeline": self.timeline
+        }
+    
+    def summary_data(self):
+        """Estado y resultado del resumen generado en segundo plano"""
+        return {
+            "summary_status": self.summary_status,
+            "summary": self.summary,
+            "suggestions": self.suggestions,
+            "summary_degraded": self.summary_degraded
+        }
+    
+    def json_fields(self):
+        """Campos públicos con las fechas sin convertir"""
         return {
             "id": self.id,
             "business_goal": self.business_goal,
@@ -39,6 +69,14 @@ class ProjectBrief(Base):
             "constraints": self.constraints or [],
             "budget_range": self.budget_range,
             "timeline": self.timeline,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
+    
+    def to_dict(self):
+        """Convertir a diccionario"""
+        return isoformat_dates(self.json_fields())
+    
+    def to_json(self) -> bytes:
+        """Serializar directamente a JSON"""
+        return dumps(self.json_fields())
@@ -2,13 +2,17 @@
 Modelo de Chat y mensajes
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.core.responses import dumps, isoformat_dates
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_device_token_last_activity", "device_token", "last_activity"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(255), unique=True, index=True)
@@ -26,19 +30,28 @@ class ChatSession(Base):
     # Relación con mensajes
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
     
-    def to_dict(self):
+    def json_fields(self):
         return {
             "id": self.id,
             "session_id": self.session_id,
             "current_step": self.current_step,
             "current_question_key": self.current_question_key,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "last_activity": self.last_activity.isoformat() if self.last_activity else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "last_activity": self.last_activity,
         }
+    
+    def to_dict(self):
+        return isoformat_dates(self.json_fields())
+    
+    def to_json(self) -> bytes:
+        return dumps(self.json_fields())
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_created_at", "session_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"))
@@ -51,11 +64,17 @@ class ChatMessage(Base):
     # Relación con sesión
     session = relationship("ChatSession", back_populates="messages")
     
-    def to_dict(self):
+    def json_fields(self):
         return {
             "id": self.id,
             "session_id": self.session_id,
             "role": self.role,
             "content": self.content,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": self.created_at,
         }
+    
+    def to_dict(self):
+        return isoformat_dates(self.json_fields())
+    
+    def to_json(self) -> bytes:
+        return dumps(self.json_fields())
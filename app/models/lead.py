@@ -2,13 +2,17 @@
 Modelo de Lead
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.core.responses import dumps, isoformat_dates
 
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        Index("ix_leads_status_priority_created_at", "status", "priority", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     brief_id = Column(Integer, ForeignKey("project_briefs.id"), nullable=True)
@@ -34,7 +38,7 @@ class Lead(Base):
     # Relación con brief
     brief = relationship("ProjectBrief", foreign_keys=[brief_id])
     
-    def to_dict(self):
+    def json_fields(self):
         return {
             "id": self.id,
             "brief_id": self.brief_id,
@@ -46,6 +50,12 @@ class Lead(Base):
             "notes": self.notes,
             "status": self.status,
             "priority": self.priority,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
+    
+    def to_dict(self):
+        return isoformat_dates(self.json_fields())
+    
+    def to_json(self) -> bytes:
+        return dumps(self.json_fields())
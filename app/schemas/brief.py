@@ -3,6 +3,7 @@ Esquemas Pydantic para Brief
 """
 
 from pydantic import BaseModel
+from app.core.responses import JSONModel
 from typing import List, Optional
 from datetime import datetime
 
@@ -36,7 +37,7 @@ class BriefSaveRequest(BaseModel):
     device_token: Optional[str] = None
     session_id: Optional[str] = None
 
-class BriefSaveResponse(BaseModel):
+class BriefSaveResponse(JSONModel):
     success: bool
     brief_id: Optional[int] = None
     message: str
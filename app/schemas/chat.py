@@ -3,6 +3,7 @@ Esquemas Pydantic para Chat
 """
 
 from pydantic import BaseModel
+from app.core.responses import JSONModel
 from typing import List, Optional
 from datetime import datetime
 
@@ -21,17 +22,32 @@ class ChatMessageResponse(ChatMessageBase):
     class Config:
         from_attributes = True
 
+class ChatHistoryResponse(JSONModel):
+    messages: List[ChatMessageResponse]
+    next_cursor: Optional[str] = None  # Usar como ``since`` para mensajes más nuevos
+    prev_cursor: Optional[str] = None  # Usar como ``before`` si hay mensajes más antiguos
+    has_more: bool = False
+
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     device_token: Optional[str] = None
 
-class ChatResponse(BaseModel):
+class ChatResponse(JSONModel):
     message: str
     step: Optional[str] = None  # "asking" o "done"
     current_key: Optional[str] = None
     suggestions: Optional[List[str]] = None
     summary: Optional[str] = None
+    degraded: bool = False  # True si parte de la respuesta es el resumen simple de respaldo
+    job_id: Optional[str] = None  # Con step="summarizing": trabajo que genera el resumen
+
+class SummaryResponse(JSONModel):
+    status: str  # "pending" o "done"
+    job_id: Optional[str] = None
+    summary: Optional[str] = None
+    suggestions: Optional[List[str]] = None
+    degraded: bool = False
 
 class ChatSessionResponse(BaseModel):
     id: int
@@ -47,7 +63,7 @@ class ChatSessionResponse(BaseModel):
 class DeviceInitRequest(BaseModel):
     device_fingerprint: Optional[str] = None
 
-class DeviceInitResponse(BaseModel):
+class DeviceInitResponse(JSONModel):
     success: bool
     device_token: str
     fingerprint_salt: str
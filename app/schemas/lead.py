@@ -3,6 +3,7 @@ Esquemas Pydantic para Lead
 """
 
 from pydantic import BaseModel
+from app.core.responses import JSONModel
 from typing import Optional, Dict, Any
 from datetime import datetime
 
@@ -35,7 +36,7 @@ class LeadCreateRequest(BaseModel):
     brief_id: Optional[int] = None
     contact_info: Optional[Dict[str, Any]] = None
 
-class LeadCreateResponse(BaseModel):
+class LeadCreateResponse(JSONModel):
     success: bool
     lead_id: Optional[int] = None
     message: str
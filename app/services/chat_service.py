@@ -3,18 +3,26 @@ Servicio de Chat para Business Analyst
 Maneja la lógica de conversación y flujo de preguntas
 """
 
-from typing import Dict, Any, Optional, List
+import asyncio
+import uuid
+from typing import Dict, Any, Optional, List, AsyncIterator
+from fastapi import Request
 import structlog
 from app.services.llm_service import LLMService
 from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.metrics import SUMMARY_FALLBACKS
+from app.services.llm_scheduler import PRIORITY_SUMMARY
 
 logger = structlog.get_logger()
 
 class ChatService:
     """Servicio para manejar la lógica del chat Business Analyst"""
     
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: Optional[LLMService] = None, summary_mode: Optional[str] = None):
+        self.llm_service = llm_service or LLMService()
+        # "sync": el resumen se genera en la petición; "background": lo genera SummaryJobQueue
+        self.summary_mode = summary_mode or settings.SUMMARY_MODE
         self.questions = [
             {"key": "business_goal", "text": "¿Cuál es el objetivo principal de tu proyecto?"},
             {"key": "audience", "text": "¿Quién es tu público objetivo?"},
@@ -25,15 +33,19 @@ class ChatService:
             {"key": "timeline", "text": "¿Plazo deseado o fecha objetivo para una primera versión?"}
         ]
     
-    def process_message(
+    async def process_message(
         self, 
         user_message: str, 
         brief_data: Dict[str, Any], 
         current_step: str,
-        current_question_key: Optional[str] = None
+        current_question_key: Optional[str] = None,
+        deadline: Optional[Deadline] = None
     ) -> Dict[str, Any]:
         """
         Procesar mensaje del usuario y generar respuesta
+        
+        Las llamadas al LLM respetan ``deadline``; si se agota se responde con
+        el resumen simple marcado como ``degraded``.
         """
         try:
             logger.info("Procesando mensaje", 
@@ -47,7 +59,13 @@ class ChatService:
             
             # Si estamos en fase de preguntas
             elif current_step == "asking":
-                return self._handle_question_phase(user_message, brief_data, current_question_key)
+                return await self._handle_question_phase(
+                    user_message, brief_data, current_question_key, deadline
+                )
+            
+            # El resumen se está generando en segundo plano
+            elif current_step == "summarizing":
+                return self._handle_summarizing_phase(brief_data)
             
             # Si ya terminamos
             elif current_step == "done":
@@ -64,6 +82,21 @@ class ChatService:
                 "current_key": current_question_key
             }
     
+    def triggers_llm(
+        self, 
+        user_message: str, 
+        brief_data: Dict[str, Any], 
+        current_step: str,
+        current_question_key: Optional[str] = None
+    ) -> bool:
+        """Indicar si el turno terminará generando el resumen con el LLM, sin modificar el brief"""
+        if current_step != "asking":
+            return False
+        pending = [question["key"] for question in self.questions if not brief_data.get(question["key"])]
+        if current_question_key in pending and self._parse_answer(current_question_key, user_message):
+            pending.remove(current_question_key)
+        return not pending
+    
     def _handle_intro(self) -> Dict[str, Any]:
         """Manejar fase de introducción"""
         intro_message = (
@@ -80,35 +113,173 @@ class ChatService:
             "current_key": "business_goal"
         }
     
-    def _handle_question_phase(
+    async def _handle_question_phase(
         self, 
         user_message: str, 
         brief_data: Dict[str, Any], 
-        current_question_key: Optional[str]
+        current_question_key: Optional[str],
+        deadline: Optional[Deadline] = None
     ) -> Dict[str, Any]:
         """Manejar fase de preguntas"""
         
         # Si tenemos una pregunta actual, procesar la respuesta
+        brief_update = {}
         if current_question_key:
-            # Actualizar brief con la respuesta
-            brief_data[current_question_key] = self._parse_answer(current_question_key, user_message)
-            logger.info("Respuesta procesada", 
-                       question=current_question_key, 
-                       answer=user_message[:50])
+            brief_update = self._record_answer(brief_data, current_question_key, user_message)
         
         # Buscar siguiente pregunta
         next_question = self._get_next_question(brief_data)
         
         if next_question:
             # Hay más preguntas
-            return {
+            response = {
                 "message": next_question["text"],
                 "step": "asking",
                 "current_key": next_question["key"]
             }
+        elif self.summary_mode == "background":
+            # El resumen lo genera un worker; se responde de inmediato con el id del trabajo
+            response = self._summary_job_response()
+            brief_update.update(summary_status="pending", summary_job_id=response["job_id"])
         else:
             # No hay más preguntas, generar resumen
-            return self._generate_summary(brief_data)
+            response = await self._generate_summary(brief_data, deadline)
+        
+        # Campos del brief modificados en este turno, para persistirlos
+        response["brief_update"] = brief_update
+        return response
+    
+    def _record_answer(self, brief_data: Dict[str, Any], question_key: str, user_message: str) -> Dict[str, Any]:
+        """Actualizar brief con la respuesta del usuario y devolver el campo modificado"""
+        brief_data[question_key] = self._parse_answer(question_key, user_message)
+        logger.info("Respuesta procesada", 
+                   question=question_key, 
+                   answer=user_message[:50])
+        return {question_key: brief_data[question_key]}
+    
+    async def stream_message(
+        self, 
+        user_message: str, 
+        brief_data: Dict[str, Any], 
+        current_step: str,
+        current_question_key: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Procesar mensaje del usuario emitiendo eventos a medida que se generan.
+        
+        Emite eventos ``summary`` y ``suggestions`` con los tokens del LLM y
+        termina siempre con un evento ``final`` con la respuesta completa.
+        """
+        if current_step != "asking":
+            yield {"event": "final", "data": await self.process_message(
+                user_message, brief_data, current_step, current_question_key, deadline
+            )}
+            return
+        
+        try:
+            brief_update = {}
+            if current_question_key:
+                brief_update = self._record_answer(brief_data, current_question_key, user_message)
+            next_question = self._get_next_question(brief_data)
+        except Exception as e:
+            logger.error("Error procesando mensaje", error=str(e))
+            yield {"event": "final", "data": {
+                "message": "Lo siento, hubo un error procesando tu mensaje. Por favor, intenta de nuevo.",
+                "step": current_step,
+                "current_key": current_question_key
+            }}
+            return
+        
+        if next_question:
+            yield {"event": "final", "data": {
+                "message": next_question["text"],
+                "step": "asking",
+                "current_key": next_question["key"],
+                "brief_update": brief_update
+            }}
+            return
+        
+        if self.summary_mode == "background":
+            response = self._summary_job_response()
+            brief_update.update(summary_status="pending", summary_job_id=response["job_id"])
+            response["brief_update"] = brief_update
+            yield {"event": "final", "data": response}
+            return
+        
+        async for event in self._stream_summary(brief_data, deadline):
+            if event["event"] == "final":
+                event["data"]["brief_update"] = brief_update
+            yield event
+    
+    async def _stream_summary(
+        self, 
+        brief_data: Dict[str, Any], 
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Generar resumen y sugerencias en paralelo emitiendo los tokens del LLM"""
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def pump(field: str, prompt: str) -> str:
+            chunks = []
+            try:
+                async for token in self.llm_service.astream([
+                    {"role": "user", "content": prompt}
+                ], deadline=deadline, priority=PRIORITY_SUMMARY):
+                    chunks.append(token)
+                    await queue.put({"event": field, "data": {"token": token}})
+                return "".join(chunks)
+            finally:
+                await queue.put(None)
+        
+        tasks = [
+            asyncio.ensure_future(pump("summary", self._create_summary_prompt(brief_data))),
+            asyncio.ensure_future(pump("suggestions", self._create_suggestions_prompt(brief_data))),
+        ]
+        try:
+            pending = len(tasks)
+            while pending:
+                event = await queue.get()
+                if event is None:
+                    pending -= 1
+                else:
+                    yield event
+        finally:
+            # Cancelar las generaciones si el cliente se desconecta
+            for task in tasks:
+                task.cancel()
+        
+        summary_result, suggestions_result = await asyncio.gather(*tasks, return_exceptions=True)
+        yield {"event": "final", "data": self._merge_summary_results(
+            brief_data, summary_result, suggestions_result
+        )}
+    
+    def _summary_job_response(self) -> Dict[str, Any]:
+        """Respuesta inmediata al encargar el resumen a un worker"""
+        return {
+            "message": (
+                "¡Excelente! Hemos recopilado toda la información necesaria. "
+                "Estamos preparando el resumen de tu proyecto, estará listo en unos segundos."
+            ),
+            "step": "summarizing",
+            "job_id": uuid.uuid4().hex
+        }
+    
+    def _handle_summarizing_phase(self, brief_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Manejar mensajes mientras el resumen se genera en segundo plano"""
+        if brief_data.get("summary_status") == "done":
+            # El worker ya guardó el resumen: entregarlo y cerrar la fase
+            response = self._build_summary_response(brief_data.get("summary") or "", brief_data.get("suggestions") or [])
+            response["degraded"] = bool(brief_data.get("summary_degraded"))
+            return response
+        return {
+            "message": "Seguimos preparando el resumen de tu proyecto. Te lo mostraremos en cuanto esté listo.",
+            "step": "summarizing"
+        }
+    
+    async def summarize(self, brief_data: Dict[str, Any], deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Generar el resumen final y las sugerencias fuera del flujo de preguntas"""
+        return await self._generate_summary(brief_data, deadline)
     
     def _handle_done_phase(self, user_message: str, brief_data: Dict[str, Any]) -> Dict[str, Any]:
         """Manejar fase final"""
@@ -148,49 +319,85 @@ class ChatService:
                 return question
         return None
     
-    def _generate_summary(self, brief_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _generate_summary(
+        self, 
+        brief_data: Dict[str, Any], 
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         """Generar resumen final y sugerencias"""
-        try:
-            # Generar resumen usando LLM
-            summary_prompt = self._create_summary_prompt(brief_data)
-            suggestions_prompt = self._create_suggestions_prompt(brief_data)
-            
-            # Generar resumen
-            summary_response = self.llm_service.llm.invoke([
-                {"role": "user", "content": summary_prompt}
-            ])
-            summary = summary_response.content
-            
-            # Generar sugerencias
-            suggestions_response = self.llm_service.llm.invoke([
-                {"role": "user", "content": suggestions_prompt}
-            ])
-            suggestions_text = suggestions_response.content
-            
-            # Formatear sugerencias
-            suggestions = self._format_suggestions(suggestions_text)
-            
-            final_message = (
-                f"¡Excelente! Hemos recopilado toda la información necesaria. "
-                f"Aquí está el resumen de tu proyecto:\n\n"
-                f"{summary}\n\n"
-                f"**Sugerencias de alto nivel:**\n"
-                f"{suggestions}\n\n"
-                f"¿Te gustaría agendar una llamada para revisar estos detalles "
-                f"y discutir los siguientes pasos?"
-            )
-            
-            return {
-                "message": final_message,
-                "step": "done",
-                "summary": summary,
-                "suggestions": suggestions
-            }
-            
-        except Exception as e:
-            logger.error("Error generando resumen", error=str(e))
+        # Los dos prompts son independientes: se generan en paralelo
+        summary_result, suggestions_result = await asyncio.gather(
+            self._ask_llm(self._create_summary_prompt(brief_data), deadline),
+            self._ask_llm(self._create_suggestions_prompt(brief_data), deadline),
+            return_exceptions=True
+        )
+        return self._merge_summary_results(brief_data, summary_result, suggestions_result)
+    
+    async def _ask_llm(self, prompt: str, deadline: Optional[Deadline] = None) -> str:
+        """Enviar un prompt al LLM y devolver el texto generado"""
+        return await self.llm_service.ainvoke([
+            {"role": "user", "content": prompt}
+        ], deadline=deadline, priority=PRIORITY_SUMMARY)
+    
+    def _merge_summary_results(
+        self, 
+        brief_data: Dict[str, Any], 
+        summary_result: Any, 
+        suggestions_result: Any
+    ) -> Dict[str, Any]:
+        """
+        Combinar resumen y sugerencias, completando con el resumen simple lo que haya fallado
+        
+        Si se usó el respaldo (error o plazo agotado) la respuesta se marca ``degraded``.
+        """
+        summary_failed = isinstance(summary_result, BaseException)
+        suggestions_failed = isinstance(suggestions_result, BaseException)
+        
+        if summary_failed:
+            logger.error("Error generando resumen", error=str(summary_result))
+        if suggestions_failed:
+            logger.error("Error generando sugerencias", error=str(suggestions_result))
+        
+        if summary_failed and suggestions_failed:
+            SUMMARY_FALLBACKS.labels("all").inc()
             # Fallback a resumen simple
-            return self._generate_simple_summary(brief_data)
+            response = self._generate_simple_summary(brief_data)
+            response["degraded"] = True
+            return response
+        
+        if summary_failed:
+            SUMMARY_FALLBACKS.labels("summary").inc()
+        summary = self._simple_summary_text(brief_data) if summary_failed else summary_result
+        if suggestions_failed:
+            SUMMARY_FALLBACKS.labels("suggestions").inc()
+            suggestions = self._simple_suggestions()
+        else:
+            suggestions = [
+                line for line in self._format_suggestions(suggestions_result).split('\n') if line.strip()
+            ]
+        
+        response = self._build_summary_response(summary, suggestions)
+        response["degraded"] = summary_failed or suggestions_failed
+        return response
+    
+    def _build_summary_response(self, summary: str, suggestions: List[str]) -> Dict[str, Any]:
+        """Construir respuesta final a partir del resumen y las sugerencias"""
+        final_message = (
+            f"¡Excelente! Hemos recopilado toda la información necesaria. "
+            f"Aquí está el resumen de tu proyecto:\n\n"
+            f"{summary}\n\n"
+            f"**Sugerencias de alto nivel:**\n"
+            f"{chr(10).join(suggestions)}\n\n"
+            f"¿Te gustaría agendar una llamada para revisar estos detalles "
+            f"y discutir los siguientes pasos?"
+        )
+        
+        return {
+            "message": final_message,
+            "step": "done",
+            "summary": summary,
+            "suggestions": suggestions
+        }
     
     def _create_summary_prompt(self, brief_data: Dict[str, Any]) -> str:
         """Crear prompt para generar resumen"""
@@ -240,8 +447,8 @@ class ChatService:
         
         return '\n'.join(formatted) if formatted else suggestions_text
     
-    def _generate_simple_summary(self, brief_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generar resumen simple sin LLM"""
+    def _simple_summary_text(self, brief_data: Dict[str, Any]) -> str:
+        """Resumen determinista del brief sin LLM"""
         summary_parts = []
         
         if brief_data.get("business_goal"):
@@ -256,13 +463,20 @@ class ChatService:
         if brief_data.get("timeline"):
             summary_parts.append(f"• **Timeline**: {brief_data['timeline']}")
         
-        summary = "**Resumen del Proyecto:**\n" + "\n".join(summary_parts)
-        
-        suggestions = [
+        return "**Resumen del Proyecto:**\n" + "\n".join(summary_parts)
+    
+    def _simple_suggestions(self) -> List[str]:
+        """Sugerencias genéricas sin LLM"""
+        return [
             "1. **MVP Básico**: Implementar funcionalidades core con diseño simple y funcional",
             "2. **MVP Avanzado**: Desarrollar con integraciones y características avanzadas",
             "3. **Solución Completa**: Arquitectura escalable con todas las funcionalidades"
         ]
+    
+    def _generate_simple_summary(self, brief_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Generar resumen simple sin LLM"""
+        summary = self._simple_summary_text(brief_data)
+        suggestions = self._simple_suggestions()
         
         final_message = (
             f"¡Excelente! Hemos recopilado toda la información necesaria.\n\n"
@@ -278,3 +492,7 @@ class ChatService:
             "summary": summary,
             "suggestions": suggestions
         }
+
+def get_chat_service(request: Request) -> ChatService:
+    """Dependency para obtener el ChatService compartido de la aplicación"""
+    return request.app.state.chat_service
@@ -0,0 +1,160 @@
+"""
+Ensamblador de contexto para prompts del LLM
+Historial reciente acotado por presupuesto de tokens y brief compactado
+"""
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from fastapi import Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+from app.core.config import settings
+from app.models.chat import ChatMessage
+
+logger = structlog.get_logger()
+
+_encoding = None
+
+def estimate_tokens(text: str) -> int:
+    """Estimar tokens con tiktoken si está instalado (lo instala langchain-openai)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    # Aproximación: ~4 caracteres por token
+    return (len(text) + 3) // 4
+
+def compact_brief(brief_data: Dict[str, Any]) -> str:
+    """Representar el brief sin claves vacías y con las listas en una línea"""
+    lines = []
+    for key, value in brief_data.items():
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(item) for item in value if item)
+        if value:
+            lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
+def fit_history(history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """Mensajes más recientes de ``history`` cuyo total cabe en ``budget`` tokens"""
+    kept: List[Dict[str, str]] = []
+    for message in reversed(history):
+        budget -= estimate_tokens(message["content"])
+        if budget < 0:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
+
+class ConversationContext:
+    """Ventana de mensajes de una sesión que cabe en el presupuesto"""
+
+    __slots__ = ("messages", "total_tokens", "last_id")
+
+    def __init__(self):
+        self.messages: Deque[Tuple[int, str, str, int]] = deque()
+        self.total_tokens = 0
+        self.last_id: Optional[int] = None
+
+class ContextAssembler:
+    """Mantiene por sesión el historial reciente y solo lee de la base de datos el delta"""
+
+    def __init__(self, token_budget: int, max_sessions: int):
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[int, ConversationContext]" = OrderedDict()
+
+    async def history(self, db: AsyncSession, session_pk: int) -> List[Dict[str, str]]:
+        """Mensajes recientes de la sesión como ``{"role", "content"}`` dentro del presupuesto"""
+        context = self._sessions.get(session_pk)
+        if context is None:
+            rows = await self._load_recent(db, session_pk)
+            # Se guarda tras la lectura: otra llamada concurrente pudo crearlo mientras tanto
+            context = self._sessions.setdefault(session_pk, ConversationContext())
+        else:
+            rows = await self._load_delta(db, session_pk, context.last_id)
+        self._sessions.move_to_end(session_pk)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+        for message_id, role, content, tokens in rows:
+            if context.last_id is not None and message_id <= context.last_id:
+                # Ya añadido por una llamada concurrente que leyó el mismo delta
+                continue
+            context.messages.append((message_id, role, content, tokens))
+            context.total_tokens += tokens
+            context.last_id = message_id
+        self._trim(context)
+
+        return [
+            {"role": "assistant" if role == "bot" else "user", "content": content}
+            for _, role, content, _ in context.messages
+        ]
+
+    def forget(self, session_pk: int):
+        """Descartar el estado en caché de una sesión"""
+        self._sessions.pop(session_pk, None)
+
+    def _trim(self, context: ConversationContext):
+        """Quitar los mensajes más antiguos hasta respetar el presupuesto"""
+        while context.messages and context.total_tokens > self.token_budget:
+            _, _, _, tokens = context.messages.popleft()
+            context.total_tokens -= tokens
+
+    async def _load_recent(self, db: AsyncSession, session_pk: int) -> List[Tuple[int, str, str, int]]:
+        """Últimos mensajes de la sesión en orden cronológico hasta cubrir el presupuesto
+
+        Se lee hacia atrás en páginas de MAX_CHAT_HISTORY filas y se para en
+        cuanto los tokens acumulados superan el presupuesto, sea cual sea el
+        número de mensajes que eso suponga.
+        """
+        rows: List[Tuple[int, str, str, int]] = []
+        total_tokens = 0
+        page_size = settings.MAX_CHAT_HISTORY
+        while total_tokens <= self.token_budget:
+            result = await db.execute(
+                select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+                .where(ChatMessage.session_id == session_pk)
+                .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+                .offset(len(rows))
+                .limit(page_size)
+            )
+            page = result.all()
+            for message_id, role, content in page:
+                tokens = estimate_tokens(content)
+                rows.append((message_id, role, content, tokens))
+                total_tokens += tokens
+                if total_tokens > self.token_budget:
+                    break
+            if len(page) < page_size:
+                break
+        rows.reverse()
+        return rows
+
+    async def _load_delta(self, db: AsyncSession, session_pk: int, last_id: Optional[int]) -> List[Tuple[int, str, str, int]]:
+        """Mensajes añadidos desde la última lectura"""
+        query = select(ChatMessage.id, ChatMessage.role, ChatMessage.content).where(
+            ChatMessage.session_id == session_pk
+        )
+        if last_id is not None:
+            query = query.where(ChatMessage.id > last_id)
+        result = await db.execute(query.order_by(ChatMessage.created_at, ChatMessage.id))
+        return [
+            (message_id, role, content, estimate_tokens(content))
+            for message_id, role, content in result.all()
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "token_budget": self.token_budget,
+        }
+
+def get_context_assembler(request: Request) -> ContextAssembler:
+    """Dependency para obtener el ensamblador de contexto de la aplicación"""
+    return request.app.state.context_assembler
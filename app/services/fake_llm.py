@@ -0,0 +1,199 @@
+"""
+Proveedor de LLM falso para ejecuciones locales y benchmarks
+Simula la latencia, el streaming, los errores y los timeouts del proveedor sin llamadas de red
+"""
+
+import asyncio
+import json
+import math
+import random
+import time
+from itertools import count
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+from app.core.config import settings
+
+# Respuestas por defecto según el prompt del ChatService
+DEFAULT_RESPONSES: Dict[str, str] = {
+    "genera 3 sugerencias": "1. MVP Básico\n2. MVP Avanzado\n3. Solución Completa",
+    "genera un resumen profesional": "**Resumen del proyecto:** plataforma orientada al objetivo de negocio descrito en el brief.",
+    "": "Entendido. ¿Puedes contarme algo más sobre tu proyecto?",
+}
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+class FakeMessage:
+    """Respuesta mínima compatible con los mensajes de LangChain"""
+
+    def __init__(self, content: str, usage_metadata: Optional[Dict[str, int]] = None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+def _content(message: Any) -> str:
+    if isinstance(message, dict):
+        return str(message.get("content", ""))
+    return str(getattr(message, "content", message))
+
+class FakeLLM:
+    """LLM falso con la interfaz ``invoke``/``ainvoke``/``astream`` de LangChain
+
+    ``latency`` es el tiempo hasta el primer token, con la distribución
+    ``distribution`` (``jitter`` es el ancho en ``uniform``, la desviación en
+    ``normal`` y la sigma en ``lognormal``); con probabilidad ``tail_rate`` se
+    usa ``tail_latency``. Después, los tokens llegan a ``tokens_per_second``
+    (0: todos a la vez). ``error_rate`` y ``timeout_rate`` hacen fallar la
+    llamada, esta última tras colgarse ``timeout`` segundos.
+
+    ``responses`` es una lista que se recorre en orden o un diccionario de
+    fragmento del último mensaje → respuesta (la clave ``""`` es la de
+    respaldo). Con ``blocking=True`` ``ainvoke`` duerme de forma síncrona,
+    igual que una llamada ``invoke`` bloqueante dentro del event loop.
+    """
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.0,
+        distribution: str = "uniform",
+        tokens_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout: float = 10.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 0.0,
+        responses: Union[List[str], Dict[str, str], str, None] = None,
+        blocking: bool = False,
+        seed: Optional[int] = None
+    ):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribución de latencia no soportada: {distribution}")
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout = timeout
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.responses = DEFAULT_RESPONSES if responses is None else responses
+        self.blocking = blocking
+        self.random = random.Random(seed)
+        self.calls = 0
+        self._sequence = count()
+
+    def _delay(self) -> float:
+        """Tiempo hasta el primer token"""
+        if self.random.random() < self.tail_rate:
+            return self.tail_latency
+        if self.distribution == "uniform":
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        elif self.distribution == "normal":
+            delay = self.random.gauss(self.latency, self.jitter)
+        elif self.distribution == "lognormal":
+            delay = self.random.lognormvariate(math.log(self.latency), self.jitter) if self.latency > 0 else 0.0
+        elif self.distribution == "exponential":
+            delay = self.random.expovariate(1 / self.latency) if self.latency > 0 else 0.0
+        else:
+            delay = self.latency
+        return max(0.0, delay)
+
+    def _response(self, messages: List[Any]) -> str:
+        if isinstance(self.responses, str):
+            return self.responses
+        if isinstance(self.responses, list):
+            return self.responses[next(self._sequence) % len(self.responses)] if self.responses else ""
+        prompt = _content(messages[-1]).lower() if messages else ""
+        for fragment, response in self.responses.items():
+            if fragment and fragment.lower() in prompt:
+                return response
+        return self.responses.get("", "")
+
+    def _usage(self, messages: List[Any], response: str) -> Dict[str, int]:
+        """Tokens aproximados por palabras, como los que informa el proveedor"""
+        prompt = sum(len(_content(message).split()) for message in messages)
+        return {"input_tokens": prompt, "output_tokens": len(response.split())}
+
+    def _fault(self) -> Optional[str]:
+        """Fallo simulado de esta llamada: ``"error"``, ``"timeout"`` o None"""
+        roll = self.random.random()
+        if roll < self.error_rate:
+            return "error"
+        if roll < self.error_rate + self.timeout_rate:
+            return "timeout"
+        return None
+
+    def _generation_time(self, response: str) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return max(len(response.split()) - 1, 0) / self.tokens_per_second
+
+    def invoke(self, messages: List[Any]) -> FakeMessage:
+        self.calls += 1
+        fault = self._fault()
+        if fault == "timeout":
+            time.sleep(self.timeout)
+            raise TimeoutError("Timeout simulado del proveedor")
+        response = self._response(messages)
+        time.sleep(self._delay() + self._generation_time(response))
+        if fault == "error":
+            raise RuntimeError("Error simulado del proveedor")
+        return FakeMessage(response, self._usage(messages, response))
+
+    async def ainvoke(self, messages: List[Any]) -> FakeMessage:
+        if self.blocking:
+            return self.invoke(messages)
+        self.calls += 1
+        fault = self._fault()
+        if fault == "timeout":
+            await asyncio.sleep(self.timeout)
+            raise TimeoutError("Timeout simulado del proveedor")
+        response = self._response(messages)
+        await asyncio.sleep(self._delay() + self._generation_time(response))
+        if fault == "error":
+            raise RuntimeError("Error simulado del proveedor")
+        return FakeMessage(response, self._usage(messages, response))
+
+    async def astream(self, messages: List[Any]) -> AsyncIterator[FakeMessage]:
+        self.calls += 1
+        fault = self._fault()
+        sleep = self._blocking_sleep if self.blocking else asyncio.sleep
+        if fault == "timeout":
+            await sleep(self.timeout)
+            raise TimeoutError("Timeout simulado del proveedor")
+        await sleep(self._delay())
+        if fault == "error":
+            raise RuntimeError("Error simulado del proveedor")
+        response = self._response(messages)
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, token in enumerate(response.split(" ")):
+            if i:
+                await sleep(interval)
+            yield FakeMessage(token if i == 0 else f" {token}")
+
+    @staticmethod
+    async def _blocking_sleep(seconds: float):
+        time.sleep(seconds)
+
+def load_responses(path: str) -> Union[List[str], Dict[str, str], None]:
+    """Respuestas guionizadas de un fichero JSON; None sin fichero"""
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        responses = json.load(f)
+    if not isinstance(responses, (list, dict)):
+        raise ValueError(f"FAKE_LLM_RESPONSES debe contener una lista o un objeto JSON: {path}")
+    return responses
+
+def create_fake_llm() -> FakeLLM:
+    """LLM falso configurado con los ajustes ``FAKE_LLM_*``"""
+    return FakeLLM(
+        latency=settings.FAKE_LLM_LATENCY,
+        jitter=settings.FAKE_LLM_JITTER,
+        distribution=settings.FAKE_LLM_LATENCY_DISTRIBUTION,
+        tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+        error_rate=settings.FAKE_LLM_ERROR_RATE,
+        timeout_rate=settings.FAKE_LLM_TIMEOUT_RATE,
+        timeout=settings.FAKE_LLM_TIMEOUT,
+        responses=load_responses(settings.FAKE_LLM_RESPONSES),
+        seed=settings.FAKE_LLM_SEED or None
+    )
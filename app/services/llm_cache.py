@@ -0,0 +1,198 @@
+"""
+Caché de respuestas del LLM
+Backends en memoria (LRU con TTL), SQLite y Redis
+"""
+
+import hashlib
+import json
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from anyio import to_thread
+import structlog
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+def _message_parts(message: Any) -> tuple:
+    """Obtener rol y contenido de un mensaje dict o de LangChain"""
+    if isinstance(message, dict):
+        return message.get("role", ""), message.get("content", "")
+    return getattr(message, "type", ""), getattr(message, "content", "")
+
+def make_cache_key(provider: str, model: str, temperature: float, messages: List[Any]) -> str:
+    """Hash normalizado de proveedor, modelo, temperatura y mensajes"""
+    normalized = [
+        # Los prompts se construyen con f-strings indentadas: se normaliza el espaciado
+        [role, " ".join(str(content).split())]
+        for role, content in map(_message_parts, messages)
+    ]
+    payload = json.dumps(
+        [provider, model, round(float(temperature), 3), normalized],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache(ABC):
+    """Interfaz común de los backends de caché con contadores de aciertos"""
+
+    backend = "base"
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        """Buscar una respuesta y contabilizar el acierto o fallo"""
+        try:
+            value = await self._get(key)
+        except Exception as e:
+            logger.warning("Error leyendo caché LLM", backend=self.backend, error=str(e))
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        """Guardar una respuesta; los errores del backend no interrumpen el chat"""
+        try:
+            await self._set(key, value)
+        except Exception as e:
+            logger.warning("Error escribiendo caché LLM", backend=self.backend, error=str(e))
+
+    async def close(self):
+        """Liberar recursos del backend"""
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[str]:
+        """Leer la respuesta guardada en el backend; None si no existe o expiró"""
+
+    @abstractmethod
+    async def _set(self, key: str, value: str):
+        """Guardar la respuesta en el backend con el TTL de la caché"""
+
+class MemoryLLMCache(LLMCache):
+    """LRU acotado en memoria con expiración por TTL"""
+
+    backend = "memory"
+
+    def __init__(self, ttl: int, max_entries: int):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def _set(self, key: str, value: str):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["entries"] = len(self._entries)
+        return stats
+
+class SQLiteLLMCache(LLMCache):
+    """Caché persistente en un archivo SQLite local"""
+
+    backend = "sqlite"
+
+    def __init__(self, ttl: int, path: str):
+        super().__init__(ttl)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_sync(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl)
+            )
+            self._conn.commit()
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await to_thread.run_sync(self._get_sync, key)
+
+    async def _set(self, key: str, value: str):
+        await to_thread.run_sync(self._set_sync, key, value)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+class RedisLLMCache(LLMCache):
+    """Caché compartida entre workers en Redis"""
+
+    backend = "redis"
+
+    def __init__(self, ttl: int, url: str, prefix: str = "llm_cache:"):
+        super().__init__(ttl)
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ValueError("El backend redis de la caché LLM requiere el paquete 'redis'")
+        self.prefix = prefix
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await self._client.get(self.prefix + key)
+
+    async def _set(self, key: str, value: str):
+        await self._client.set(self.prefix + key, value, ex=self.ttl)
+
+    async def close(self):
+        await self._client.close()
+
+def create_llm_cache(backend: Optional[str] = None) -> Optional[LLMCache]:
+    """Crear la caché configurada en LLM_CACHE_BACKEND"""
+    backend = backend or settings.LLM_CACHE_BACKEND
+    if backend == "none":
+        return None
+    elif backend == "memory":
+        return MemoryLLMCache(settings.LLM_CACHE_TTL, settings.LLM_CACHE_MAX_ENTRIES)
+    elif backend == "sqlite":
+        return SQLiteLLMCache(settings.LLM_CACHE_TTL, settings.LLM_CACHE_SQLITE_PATH)
+    elif backend == "redis":
+        return RedisLLMCache(settings.LLM_CACHE_TTL, settings.REDIS_URL)
+    else:
+        raise ValueError(f"Backend de caché LLM no soportado: {backend}")
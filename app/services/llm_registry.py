@@ -0,0 +1,86 @@
+"""
+Registro de clientes LLM compartidos por proceso
+Crea cada cliente una sola vez por proveedor/modelo/temperatura
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+import structlog
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+class LLMRegistry:
+    """Registro thread-safe de clientes LLM construidos bajo demanda"""
+
+    def __init__(self, default_provider: Optional[str] = None):
+        self.default_provider = default_provider or settings.DEFAULT_LLM_PROVIDER
+        self._clients: Dict[Tuple[str, str, float], object] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.7
+    ):
+        """Obtener el cliente compartido, construyéndolo en el primer uso"""
+        provider = provider or self.default_provider
+        model = model or self.default_model(provider)
+        key = (provider, model, temperature)
+
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._build(provider, model, temperature)
+                self._clients[key] = client
+                logger.info("Cliente LLM inicializado", provider=provider, model=model)
+        return client
+
+    def clear(self):
+        """Descartar los clientes creados"""
+        with self._lock:
+            self._clients.clear()
+
+    def default_model(self, provider: str) -> str:
+        """Modelo configurado para el proveedor"""
+        if provider == "groq":
+            return settings.GROQ_MODEL
+        elif provider == "openai":
+            return settings.OPENAI_MODEL
+        elif provider == "fake":
+            return "fake"
+        else:
+            raise ValueError(f"Proveedor de LLM no soportado: {provider}")
+
+    def _build(self, provider: str, model: str, temperature: float):
+        """Construir el cliente LangChain del proveedor"""
+        if provider == "groq":
+            if not settings.GROQ_API_KEY:
+                raise ValueError("GROQ_API_KEY no está configurada")
+            from langchain_groq import ChatGroq
+            return ChatGroq(
+                groq_api_key=settings.GROQ_API_KEY,
+                model_name=model,
+                temperature=temperature,
+                max_tokens=1024
+            )
+        elif provider == "openai":
+            if not settings.OPENAI_API_KEY:
+                raise ValueError("OPENAI_API_KEY no está configurada")
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(
+                openai_api_key=settings.OPENAI_API_KEY,
+                model_name=model,
+                temperature=temperature,
+                max_tokens=1024
+            )
+        elif provider == "fake":
+            from app.services.fake_llm import create_fake_llm
+            return create_fake_llm()
+        else:
+            raise ValueError(f"Proveedor de LLM no soportado: {provider}")
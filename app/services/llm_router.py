@@ -0,0 +1,326 @@
+"""
+Enrutado de llamadas al LLM entre proveedores
+Elige el proveedor sano más rápido, con circuit breaker y peticiones de cobertura
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Union
+import structlog
+from app.core.config import settings
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.core.metrics import observe_llm_call
+from app.services.llm_scheduler import LLMScheduler, LLMOverloadedError, PRIORITY_CHAT, SharedTicket, create_llm_scheduler
+
+logger = structlog.get_logger()
+
+class NoProviderAvailableError(RuntimeError):
+    """Todos los proveedores tienen el circuito abierto"""
+
+class ProviderStats:
+    """Latencias y errores recientes de un proveedor con su circuit breaker"""
+
+    def __init__(self, name: str, window: int, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def score(self) -> Optional[float]:
+        """Latencia esperada por respuesta útil, p50 / (1 - tasa de error); None sin llamadas"""
+        if not self.outcomes:
+            return None
+        p50 = self.percentile(0.5)
+        success_rate = 1.0 - self.error_rate
+        if p50 is None or success_rate <= 0:
+            return float("inf")
+        return p50 / success_rate
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def acquire(self) -> bool:
+        """Indicar si se puede usar el proveedor; en semiabierto solo pasa una prueba"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self):
+        """Liberar la prueba en semiabierto si la llamada se canceló"""
+        self._probing = False
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.opened_at is not None:
+            logger.info("Circuito del proveedor LLM cerrado", provider=self.name)
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            logger.warning(
+                "Circuito del proveedor LLM abierto",
+                provider=self.name,
+                consecutive_failures=self.consecutive_failures
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "calls": len(self.outcomes),
+            "error_rate": round(self.error_rate, 4),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "score": self.score(),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+class LLMRouter:
+    """Reparte las llamadas entre proveedores según latencia y salud
+
+    Los proveedores sin circuito abierto se ordenan por p50 penalizado con su
+    tasa de error; los que aún no tienen muestras reciben la puntuación
+    mediana de los demás, y los empates se resuelven en el orden configurado. Si la
+    llamada falla se prueba el siguiente proveedor, y con ``hedge_delay`` se
+    lanza una segunda petición cuando la primera tarda más de ese tiempo.
+    Cada llamada ocupa un slot del proveedor en el LLMScheduler.
+    """
+
+    def __init__(
+        self,
+        registry,
+        providers: List[str],
+        temperature: float = 0.7,
+        hedge_delay: float = 0.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        window: int = 100,
+        scheduler: Optional[LLMScheduler] = None
+    ):
+        if not providers:
+            raise ValueError("El router necesita al menos un proveedor")
+        self.registry = registry
+        self.scheduler = scheduler or create_llm_scheduler()
+        self.providers = list(providers)
+        self.temperature = temperature
+        self.hedge_delay = hedge_delay
+        self.stats_by_provider = {
+            name: ProviderStats(name, window, failure_threshold, reset_timeout)
+            for name in self.providers
+        }
+
+    @property
+    def primary(self) -> str:
+        return self.providers[0]
+
+    def ranked(self) -> List[str]:
+        """Proveedores ordenados del más rápido y fiable al peor"""
+        scores = {name: stats.score() for name, stats in self.stats_by_provider.items()}
+        known = sorted(score for score in scores.values() if score is not None)
+        neutral = known[len(known) // 2] if known else 0.0
+
+        def key(item):
+            index, name = item
+            score = scores[name]
+            return (score if score is not None else neutral, index)
+        return [name for _, name in sorted(enumerate(self.providers), key=key)]
+
+    def _next_available(self, candidates: List[str]) -> Optional[str]:
+        """Sacar de ``candidates`` el siguiente proveedor utilizable"""
+        while candidates:
+            name = candidates.pop(0)
+            if self.stats_by_provider[name].acquire():
+                return name
+        return None
+
+    async def _call(
+        self,
+        provider: str,
+        messages: List[Any],
+        priority: Union[int, SharedTicket],
+        deadline: Optional[Deadline]
+    ) -> str:
+        stats = self.stats_by_provider[provider]
+        queued = time.perf_counter()
+        try:
+            async with self.scheduler.slot(provider, priority, deadline):
+                start = time.perf_counter()
+                try:
+                    client = self.registry.get(provider, temperature=self.temperature)
+                    response = await client.ainvoke(messages)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    stats.record_failure()
+                    observe_llm_call(provider, self._model(provider), time.perf_counter() - start, outcome="error")
+                    logger.warning("Error del proveedor LLM", provider=provider, error=str(e))
+                    raise
+        except LLMOverloadedError:
+            stats.release()
+            observe_llm_call(provider, self._model(provider), time.perf_counter() - queued, outcome="shed")
+            raise
+        except BaseException:
+            # Sin resultado del proveedor (cancelada)
+            stats.release()
+            raise
+        elapsed = time.perf_counter() - start
+        stats.record_success(elapsed)
+        observe_llm_call(provider, self._model(provider), elapsed, response)
+        return response.content
+
+    def _model(self, provider: str) -> str:
+        try:
+            return self.registry.default_model(provider)
+        except ValueError:
+            return "unknown"
+
+    async def ainvoke(
+        self,
+        messages: List[Any],
+        priority: Union[int, SharedTicket] = PRIORITY_CHAT,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """Invocar el proveedor más rápido con failover y cobertura opcional"""
+        candidates = self.ranked()
+        pending: Dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            provider = self._next_available(candidates)
+            if provider is None:
+                return False
+            pending[asyncio.ensure_future(self._call(provider, messages, priority, deadline))] = provider
+            return True
+
+        try:
+            if not launch():
+                raise NoProviderAvailableError("Ningún proveedor de LLM disponible")
+            while pending:
+                hedge = self.hedge_delay > 0 and bool(candidates)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    if launch():
+                        logger.info("Petición de cobertura al LLM", provider=list(pending.values())[-1])
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                if not pending:
+                    launch()
+            raise last_error or NoProviderAvailableError("Ningún proveedor de LLM disponible")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def astream(
+        self,
+        messages: List[Any],
+        priority: int = PRIORITY_CHAT,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[str]:
+        """Emitir tokens del proveedor más rápido; solo hay failover antes del primer token"""
+        candidates = self.ranked()
+        last_error: Optional[BaseException] = None
+        while True:
+            provider = self._next_available(candidates)
+            if provider is None:
+                raise last_error or NoProviderAvailableError("Ningún proveedor de LLM disponible")
+            stats = self.stats_by_provider[provider]
+            started = False
+            start = time.perf_counter()
+            usage = None
+            try:
+                async with self.scheduler.slot(provider, priority, deadline):
+                    start = time.perf_counter()
+                    client = self.registry.get(provider, temperature=self.temperature)
+                    async for chunk in client.astream(messages):
+                        if getattr(chunk, "usage_metadata", None):
+                            # Los tokens llegan en el último fragmento si el proveedor los informa
+                            usage = chunk
+                        if chunk.content:
+                            started = True
+                            yield chunk.content
+            except (asyncio.CancelledError, GeneratorExit, DeadlineExceeded):
+                stats.release()
+                raise
+            except LLMOverloadedError as e:
+                # Descartada por el planificador: probar con otro proveedor
+                stats.release()
+                observe_llm_call(provider, self._model(provider), time.perf_counter() - start, outcome="shed")
+                last_error = e
+                continue
+            except Exception as e:
+                stats.record_failure()
+                observe_llm_call(provider, self._model(provider), time.perf_counter() - start, outcome="error")
+                logger.warning("Error del proveedor LLM", provider=provider, error=str(e))
+                if started:
+                    raise
+                last_error = e
+                continue
+            elapsed = time.perf_counter() - start
+            stats.record_success(elapsed)
+            observe_llm_call(provider, self._model(provider), elapsed, usage)
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "providers": {name: stats.to_dict() for name, stats in self.stats_by_provider.items()},
+            "ranking": self.ranked(),
+            "hedge_delay": self.hedge_delay,
+        }
+
+def create_llm_router(
+    registry,
+    temperature: float = 0.7,
+    providers: Optional[List[str]] = None,
+    scheduler: Optional[LLMScheduler] = None
+) -> LLMRouter:
+    """Crear el router con los proveedores y umbrales configurados"""
+    return LLMRouter(
+        registry,
+        providers or settings.llm_providers_list,
+        temperature=temperature,
+        hedge_delay=settings.LLM_HEDGE_DELAY,
+        failure_threshold=settings.LLM_BREAKER_FAILURES,
+        reset_timeout=settings.LLM_BREAKER_RESET,
+        window=settings.LLM_LATENCY_WINDOW,
+        scheduler=scheduler
+    )
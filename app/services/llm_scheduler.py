@@ -0,0 +1,194 @@
+"""
+Planificador de llamadas al LLM
+Limita las llamadas simultáneas por proveedor y ordena la espera por prioridad
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+import structlog
+from app.core.config import settings
+from app.core.deadline import Deadline, run_within
+
+logger = structlog.get_logger()
+
+# Menor valor, antes se atiende
+PRIORITY_SUMMARY = 0
+PRIORITY_CHAT = 10
+
+class LLMOverloadedError(RuntimeError):
+    """La cola del proveedor está llena o la espera superaría el plazo"""
+
+class _ProviderQueue:
+    """Slots ocupados, cola de espera y métricas de un proveedor"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiting: List[List[Any]] = []  # [prioridad, orden de llegada, future]
+        self.service_time = 1.0  # Media móvil de la duración de una llamada, en segundos
+        self.acquired = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self.waiting if not future.done())
+
+    def estimated_wait(self, priority: int) -> float:
+        """Espera prevista para una llamada nueva según las que tiene delante"""
+        ahead = sum(1 for p, _, future in self.waiting if p <= priority and not future.done())
+        return (ahead + 1) / self.limit * self.service_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "acquired": self.acquired,
+            "shed": self.shed,
+            "avg_wait": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0,
+            "max_wait": round(self.max_wait, 4),
+            "service_time": round(self.service_time, 4),
+        }
+
+class SharedTicket:
+    """Prioridad y plazo de una llamada compartida por varias peticiones
+
+    Vale la prioridad más alta (menor valor) y el plazo más holgado de las
+    peticiones unidas. Si se une una más urgente mientras la llamada espera
+    slot, la llamada adelanta su puesto en la cola.
+    """
+
+    __slots__ = ("priority", "deadline", "_entries")
+
+    def __init__(self, priority: int, deadline: Optional[Deadline]):
+        self.priority = priority
+        self.deadline = deadline
+        self._entries: List[Tuple[_ProviderQueue, List[Any]]] = []
+
+    def join(self, priority: int, deadline: Optional[Deadline]):
+        """Sumar una petición a la llamada"""
+        if self.deadline is not None and (deadline is None or deadline.expires_at > self.deadline.expires_at):
+            self.deadline = deadline
+        if priority < self.priority:
+            self.priority = priority
+            for queue, entry in self._entries:
+                if not entry[2].done():
+                    entry[0] = priority
+                    heapq.heapify(queue.waiting)
+
+class LLMScheduler:
+    """Concurrencia acotada por proveedor con cola de prioridad y descarte de carga
+
+    Las llamadas que no encuentran slot libre esperan en un heap ordenado por
+    prioridad y orden de llegada. Si la cola está llena o la espera prevista
+    supera el plazo de la petición se lanza LLMOverloadedError sin esperar.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._queues: Dict[str, _ProviderQueue] = {}
+        self._sequence = itertools.count()
+
+    def _queue(self, provider: str) -> _ProviderQueue:
+        queue = self._queues.get(provider)
+        if queue is None:
+            queue = self._queues[provider] = _ProviderQueue(self.max_concurrency)
+        return queue
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        provider: str,
+        priority: Union[int, SharedTicket] = PRIORITY_CHAT,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[None]:
+        """Ocupar un slot del proveedor durante la llamada
+
+        Con un SharedTicket la admisión usa su plazo y la espera no tiene
+        límite propio: cada petición unida aplica el suyo al esperar el
+        resultado y la llamada se cancela cuando no queda ninguna.
+        """
+        queue = self._queue(provider)
+        await self._acquire(queue, provider, priority, deadline)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            # Media móvil exponencial de la duración de las llamadas
+            queue.service_time = 0.8 * queue.service_time + 0.2 * (time.monotonic() - start)
+            self._release(queue)
+
+    async def _acquire(
+        self,
+        queue: _ProviderQueue,
+        provider: str,
+        priority: Union[int, SharedTicket],
+        deadline: Optional[Deadline]
+    ):
+        start = time.monotonic()
+        ticket = priority if isinstance(priority, SharedTicket) else None
+        admission = deadline
+        if ticket is not None:
+            priority, admission, deadline = ticket.priority, ticket.deadline, None
+        if queue.active < queue.limit and not queue.queued:
+            queue.active += 1
+            queue.acquired += 1
+            return
+
+        if queue.queued >= self.max_queue:
+            self._shed(queue, provider, "cola llena")
+        if admission is not None and queue.estimated_wait(priority) > admission.remaining():
+            self._shed(queue, provider, "espera mayor que el plazo")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), future]
+        heapq.heappush(queue.waiting, entry)
+        if ticket is not None:
+            ticket._entries.append((queue, entry))
+        try:
+            await run_within(deadline, future)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # El slot llegó a la vez que el plazo o la cancelación: devolverlo
+                self._release(queue)
+            else:
+                future.cancel()
+            raise
+
+        wait = time.monotonic() - start
+        queue.acquired += 1
+        queue.total_wait += wait
+        queue.max_wait = max(queue.max_wait, wait)
+
+    def _release(self, queue: _ProviderQueue):
+        """Liberar un slot y cedérselo a la siguiente llamada en espera"""
+        while queue.waiting:
+            _, _, future = heapq.heappop(queue.waiting)
+            if not future.done():
+                # El slot pasa directamente al siguiente: ``active`` no cambia
+                future.set_result(None)
+                return
+        queue.active -= 1
+
+    def _shed(self, queue: _ProviderQueue, provider: str, reason: str):
+        queue.shed += 1
+        logger.warning("Llamada al LLM descartada", provider=provider, reason=reason, queued=queue.queued)
+        raise LLMOverloadedError(f"Proveedor {provider} saturado: {reason}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "providers": {provider: queue.to_dict() for provider, queue in self._queues.items()},
+        }
+
+def create_llm_scheduler() -> LLMScheduler:
+    """Crear el planificador con los límites configurados"""
+    return LLMScheduler(settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE)
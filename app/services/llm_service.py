@@ -1,58 +1,187 @@
 """
 Servicio de LLM con LangChain
-Soporte para Groq y OpenAI
+Soporte para Groq, OpenAI y un proveedor falso sin red
 """
 
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
 import structlog
 from app.core.config import settings
+from app.core.deadline import Deadline, run_within
+from app.services.llm_registry import LLMRegistry
+from app.services.llm_cache import LLMCache, make_cache_key
+from app.services.llm_router import LLMRouter
+from app.services.llm_scheduler import LLMOverloadedError, PRIORITY_CHAT, SharedTicket
+from app.services.context_assembler import compact_brief, estimate_tokens, fit_history
 
 logger = structlog.get_logger()
 
+class _Flight:
+    """Llamada al proveedor compartida por las peticiones con el mismo prompt"""
+
+    __slots__ = ("task", "ticket", "waiters")
+
+    def __init__(self, task: asyncio.Task, ticket: SharedTicket):
+        self.task = task
+        self.ticket = ticket
+        self.waiters = 0
+
 class LLMService:
     """Servicio para interactuar con LLMs usando LangChain"""
     
-    def __init__(self, provider: str = None):
+    def __init__(
+        self, 
+        provider: str = None, 
+        registry: Optional[LLMRegistry] = None,
+        cache: Optional[LLMCache] = None,
+        temperature: float = 0.7,
+        router: Optional[LLMRouter] = None,
+        single_flight: Optional[bool] = None
+    ):
         self.provider = provider or settings.DEFAULT_LLM_PROVIDER
-        self.llm = self._initialize_llm()
+        self.registry = registry or LLMRegistry(self.provider)
+        self.cache = cache
+        self.temperature = temperature
+        # Sin router configurado se usa solo el proveedor por defecto
+        self.router = router or LLMRouter(self.registry, [self.provider], temperature=temperature)
+        self.single_flight = settings.LLM_SINGLE_FLIGHT if single_flight is None else single_flight
+        self._inflight: Dict[str, _Flight] = {}
+        self.coalesced = 0
+    
+    @property
+    def llm(self):
+        """Cliente LLM compartido, creado en el primer uso"""
+        return self.registry.get(self.provider, temperature=self.temperature)
+    
+    def _cache_key(self, messages: List[Any]) -> str:
+        """Clave de caché para los mensajes con el modelo actual"""
+        model = self.registry.default_model(self.provider)
+        return make_cache_key(self.provider, model, self.temperature, messages)
+    
+    async def ainvoke(
+        self, 
+        messages: List[Any], 
+        deadline: Optional[Deadline] = None, 
+        priority: int = PRIORITY_CHAT
+    ) -> str:
+        """Invocar el modelo pasando por la caché y devolver el texto generado
+
+        Con ``deadline`` la llamada al proveedor se corta al agotarse el plazo
+        lanzando DeadlineExceeded. Las llamadas concurrentes con el mismo prompt
+        comparten una sola petición al proveedor y su resultado o error; esa
+        petición va sin plazo propio, con la prioridad más alta y el plazo más
+        holgado de las que esperan, y cada una corta su espera con su plazo.
+        ``priority`` ordena la espera en el LLMScheduler (menor, antes).
+        """
+        key = self._cache_key(messages) if self.cache or self.single_flight else None
+        if key and self.cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
         
-    def _initialize_llm(self):
-        """Inicializar el LLM según el proveedor"""
-        if self.provider == "groq":
-            if not settings.GROQ_API_KEY:
-                raise ValueError("GROQ_API_KEY no está configurada")
-            return ChatGroq(
-                groq_api_key=settings.GROQ_API_KEY,
-                model_name=settings.GROQ_MODEL,
-                temperature=0.7,
-                max_tokens=1024
-            )
-        elif self.provider == "openai":
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("OPENAI_API_KEY no está configurada")
-            return ChatOpenAI(
-                openai_api_key=settings.OPENAI_API_KEY,
-                model_name=settings.OPENAI_MODEL,
-                temperature=0.7,
-                max_tokens=1024
-            )
+        if not self.single_flight:
+            return await run_within(deadline, self._fetch(key, messages, priority, deadline))
+        
+        flight = self._inflight.get(key)
+        if flight is None:
+            ticket = SharedTicket(priority, deadline)
+            flight = _Flight(asyncio.ensure_future(self._fetch(key, messages, ticket, None)), ticket)
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda task: self._end_flight(key, flight))
         else:
-            raise ValueError(f"Proveedor de LLM no soportado: {self.provider}")
+            self.coalesced += 1
+            flight.ticket.join(priority, deadline)
+        
+        flight.waiters += 1
+        try:
+            # shield: el plazo o la cancelación de una petición no cortan la de las demás
+            return await run_within(deadline, asyncio.shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nadie espera ya el resultado
+                self._end_flight(key, flight)
+                flight.task.cancel()
+    
+    async def _fetch(
+        self, 
+        key: Optional[str], 
+        messages: List[Any], 
+        priority: Union[int, SharedTicket], 
+        deadline: Optional[Deadline]
+    ) -> str:
+        """Llamar al proveedor y guardar la respuesta en la caché"""
+        content = await self.router.ainvoke(messages, priority=priority, deadline=deadline)
+        if key and self.cache:
+            await self.cache.set(key, content)
+        return content
     
-    def generate_business_analyst_response(
+    def _end_flight(self, key: str, flight: _Flight):
+        """Retirar la llamada terminada para que la siguiente vaya al proveedor"""
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if flight.task.done() and not flight.task.cancelled():
+            # Evitar el aviso de excepción no recuperada si ningún waiter la leyó
+            flight.task.exception()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "single_flight": self.single_flight,
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+        }
+    
+    async def astream(
+        self, 
+        messages: List[Any], 
+        deadline: Optional[Deadline] = None, 
+        priority: int = PRIORITY_CHAT
+    ) -> AsyncIterator[str]:
+        """Emitir los tokens del modelo; en un acierto de caché se emite la respuesta completa"""
+        key = self._cache_key(messages) if self.cache else None
+        if key:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        tokens = self.router.astream(messages, priority=priority, deadline=deadline)
+        try:
+            while True:
+                # El plazo se aplica a cada token para cortar un stream que se queda colgado
+                try:
+                    token = await run_within(deadline, tokens.__anext__())
+                except StopAsyncIteration:
+                    break
+                chunks.append(token)
+                yield token
+        finally:
+            await tokens.aclose()
+        
+        if key:
+            await self.cache.set(key, "".join(chunks))
+    
+    async def generate_business_analyst_response(
         self, 
         user_message: str, 
         brief_data: Dict[str, Any], 
         current_step: str,
-        current_question_key: Optional[str] = None
+        current_question_key: Optional[str] = None,
+        history: Optional[List[Dict[str, str]]] = None
     ) -> Dict[str, Any]:
         """
         Generar respuesta del Business Analyst
+
+        ``history`` son los mensajes previos de ContextAssembler. El presupuesto
+        LLM_CONTEXT_TOKEN_BUDGET cubre la lista completa: el historial solo
+        ocupa los tokens que dejan libres los prompts de sistema y de usuario.
+        Es un turno de conversación (PRIORITY_CHAT): si el proveedor está
+        saturado se propaga LLMOverloadedError para responder 503 al momento.
         """
+        # langchain_core se importa en el primer turno y no al arrancar el worker
+        from langchain_core.messages import HumanMessage, SystemMessage
+        
         try:
             # Crear prompt del sistema
             system_prompt = self._create_system_prompt()
@@ -63,16 +192,23 @@ class LLMService:
             )
             
             # Generar respuesta
+            history_budget = (
+                settings.LLM_CONTEXT_TOKEN_BUDGET
+                - estimate_tokens(system_prompt)
+                - estimate_tokens(user_prompt)
+            )
             messages = [
                 SystemMessage(content=system_prompt),
+                *fit_history(history or [], history_budget),
                 HumanMessage(content=user_prompt)
             ]
-            response = self.llm.invoke(messages)
-            content = response.content
+            content = await self.ainvoke(messages, priority=PRIORITY_CHAT)
             
             # Procesar respuesta
             return self._process_response(content, current_step, current_question_key)
             
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error("Error generando respuesta del LLM", error=str(e))
             return {
@@ -116,10 +252,10 @@ Mantén un tono profesional pero amigable. Evita tecnicismos y enfócate en el v
             prompt += "Es el inicio de la conversación. Saluda y explica que harás algunas preguntas para entender su proyecto."
         elif current_step == "asking":
             prompt += f"Estás en la fase de preguntas. Pregunta clave actual: {current_question_key}\n"
-            prompt += f"Datos recopilados hasta ahora: {brief_data}\n"
+            prompt += f"Datos recopilados hasta ahora:\n{compact_brief(brief_data)}\n"
             prompt += "Haz la siguiente pregunta de manera natural y conversacional."
         elif current_step == "done":
-            prompt += f"La conversación ha terminado. Datos finales: {brief_data}\n"
+            prompt += f"La conversación ha terminado. Datos finales:\n{compact_brief(brief_data)}\n"
             prompt += "Genera un resumen del proyecto y sugerencias de alto nivel."
         
         return prompt
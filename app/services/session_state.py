@@ -0,0 +1,307 @@
+"""
+Caché write-behind del estado de las sesiones de chat
+Sirve step/pregunta actual desde memoria (o Redis) y persiste por lotes
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import update
+import structlog
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import ACTIVE_SESSIONS
+from app.models.chat import ChatSession
+
+logger = structlog.get_logger()
+
+class SessionState:
+    """Campos de la máquina de estados de una ChatSession"""
+
+    __slots__ = ("id", "session_id", "device_token", "current_step", "current_question_key", "last_activity")
+
+    def __init__(
+        self,
+        id: int,
+        session_id: str,
+        device_token: Optional[str] = None,
+        current_step: str = "intro",
+        current_question_key: Optional[str] = None,
+        last_activity: Optional[datetime] = None
+    ):
+        self.id = id
+        self.session_id = session_id
+        self.device_token = device_token
+        self.current_step = current_step
+        self.current_question_key = current_question_key
+        self.last_activity = last_activity
+
+    def copy(self) -> "SessionState":
+        return SessionState(**{name: getattr(self, name) for name in self.__slots__})
+
+    def refresh(self, other: "SessionState"):
+        """Tomar el paso y la pregunta de ``other``, el estado más reciente"""
+        self.current_step = other.current_step
+        self.current_question_key = other.current_question_key
+        self.last_activity = other.last_activity
+
+    @classmethod
+    def from_model(cls, session: ChatSession) -> "SessionState":
+        return cls(
+            id=session.id,
+            session_id=session.session_id,
+            device_token=session.device_token,
+            current_step=session.current_step or "intro",
+            current_question_key=session.current_question_key,
+            last_activity=session.last_activity
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "device_token": self.device_token,
+            "current_step": self.current_step,
+            "current_question_key": self.current_question_key,
+            "last_activity": self.last_activity.isoformat() if self.last_activity else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionState":
+        data = dict(data)
+        if data.get("last_activity"):
+            data["last_activity"] = datetime.fromisoformat(data["last_activity"])
+        return cls(**data)
+
+async def _write_states(mappings: List[Dict[str, Any]]):
+    """Persistir un lote de estados en chat_sessions con un único commit"""
+    async with AsyncSessionLocal() as db:
+        # UPDATE por clave primaria con executemany
+        await db.execute(update(ChatSession), mappings)
+        await db.commit()
+
+class SessionStateCache:
+    """Caché en proceso con escritura diferida a la base de datos
+
+    Cada petición recibe su propia copia del estado y ``update`` admite un
+    compare-and-set sobre el paso, así que dos turnos concurrentes (o un turno
+    y el worker de resúmenes) no se pisan. La caché vive en un solo proceso:
+    con varios workers de uvicorn hay que usar el backend redis.
+    """
+
+    backend = "memory"
+
+    def __init__(self, flush_interval: float, max_entries: int):
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._states: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._dirty: set = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        """Estado en caché de la sesión, o None si hay que cargarlo de la base de datos"""
+        state = self._states.get(session_id)
+        if state is None:
+            return None
+        self._states.move_to_end(session_id)
+        return state.copy()
+
+    async def remember(self, state: SessionState):
+        """Guardar en caché un estado recién leído de la base de datos"""
+        self._states[state.session_id] = state.copy()
+        self._states.move_to_end(state.session_id)
+        self._evict()
+        ACTIVE_SESSIONS.set(len(self._states))
+
+    async def update(
+        self,
+        state: SessionState,
+        current_step: str,
+        current_question_key: Optional[str],
+        expected_step: Optional[str] = None
+    ) -> bool:
+        """
+        Actualizar el estado y marcarlo para la próxima escritura por lotes
+
+        Con ``expected_step`` solo se escribe si el paso en caché sigue siendo
+        ese; si no, ``state`` se refresca con el de la caché y devuelve False.
+        """
+        cached = self._states.get(state.session_id)
+        if expected_step is not None and cached is not None and cached.current_step != expected_step:
+            state.refresh(cached)
+            return False
+        state.current_step = current_step
+        state.current_question_key = current_question_key
+        state.last_activity = datetime.utcnow()
+        self._dirty.add(state.session_id)
+        await self.remember(state)
+        return True
+
+    def _evict(self):
+        """Descartar los estados más antiguos ya persistidos"""
+        if len(self._states) <= self.max_entries:
+            return
+        for session_id in list(self._states):
+            if len(self._states) <= self.max_entries:
+                break
+            if session_id not in self._dirty:
+                del self._states[session_id]
+
+    async def _take_dirty(self) -> List[SessionState]:
+        states = [self._states[sid] for sid in self._dirty if sid in self._states]
+        self._dirty.clear()
+        return states
+
+    async def _mark_dirty(self, states: List[SessionState]):
+        self._dirty.update(state.session_id for state in states)
+
+    async def flush(self) -> int:
+        """Escribir los estados pendientes en chat_sessions"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            states = await self._take_dirty()
+            if not states:
+                return 0
+            mappings = [
+                {
+                    "id": state.id,
+                    "current_step": state.current_step,
+                    "current_question_key": state.current_question_key,
+                    "last_activity": state.last_activity,
+                }
+                for state in states
+            ]
+            try:
+                await _write_states(mappings)
+            except Exception as e:
+                logger.error("Error persistiendo estado de sesiones", error=str(e), pending=len(states))
+                await self._mark_dirty(states)
+                return 0
+            return len(states)
+
+    async def start(self):
+        """Iniciar la escritura periódica"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_periodically())
+
+    async def stop(self):
+        """Detener la escritura periódica y persistir lo pendiente"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        flushed = await self.flush()
+        logger.info("Estado de sesiones persistido al cerrar", sessions=flushed)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "entries": len(self._states),
+            "dirty": len(self._dirty),
+        }
+
+# Compare-and-set del paso: devuelve el estado guardado si no coincide con ARGV[2]
+_UPDATE_SCRIPT = """
+local raw = redis.call('GET', KEYS[1])
+if raw and ARGV[2] ~= '' and cjson.decode(raw)['current_step'] ~= ARGV[2] then
+    return raw
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('SADD', KEYS[2], ARGV[4])
+return false
+"""
+
+class RedisSessionStateCache(SessionStateCache):
+    """Estado compartido entre workers en Redis con el mismo flush por lotes"""
+
+    backend = "redis"
+
+    def __init__(self, flush_interval: float, url: str, ttl: int, prefix: str = "session_state:"):
+        super().__init__(flush_interval, max_entries=0)
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ValueError("El backend redis del estado de sesiones requiere el paquete 'redis'")
+        self.ttl = ttl
+        self.prefix = prefix
+        self._dirty_key = f"{prefix}dirty"
+        self._client = redis.from_url(url, decode_responses=True)
+        self._update_script = self._client.register_script(_UPDATE_SCRIPT)
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        raw = await self._client.get(self.prefix + session_id)
+        return SessionState.from_dict(json.loads(raw)) if raw else None
+
+    async def remember(self, state: SessionState):
+        await self._client.set(self.prefix + state.session_id, json.dumps(state.to_dict()), ex=self.ttl)
+
+    async def update(
+        self,
+        state: SessionState,
+        current_step: str,
+        current_question_key: Optional[str],
+        expected_step: Optional[str] = None
+    ) -> bool:
+        updated = state.copy()
+        updated.current_step = current_step
+        updated.current_question_key = current_question_key
+        updated.last_activity = datetime.utcnow()
+        current = await self._update_script(
+            keys=[self.prefix + state.session_id, self._dirty_key],
+            args=[json.dumps(updated.to_dict()), expected_step or "", self.ttl, state.session_id]
+        )
+        if current:
+            state.refresh(SessionState.from_dict(json.loads(current)))
+            return False
+        state.refresh(updated)
+        return True
+
+    async def _take_dirty(self) -> List[SessionState]:
+        session_ids = await self._client.spop(self._dirty_key, 1000) or []
+        if not session_ids:
+            return []
+        raws = await self._client.mget([self.prefix + sid for sid in session_ids])
+        return [SessionState.from_dict(json.loads(raw)) for raw in raws if raw]
+
+    async def _mark_dirty(self, states: List[SessionState]):
+        if states:
+            await self._client.sadd(self._dirty_key, *(state.session_id for state in states))
+
+    async def stop(self):
+        await super().stop()
+        await self._client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend}
+
+def create_session_state_cache(backend: Optional[str] = None) -> SessionStateCache:
+    """Crear la caché configurada en SESSION_STATE_BACKEND"""
+    backend = backend or settings.SESSION_STATE_BACKEND
+    if backend == "memory":
+        if settings.WEB_CONCURRENCY > 1:
+            # Cada worker serviría y persistiría su propia copia del estado
+            raise ValueError("Con WEB_CONCURRENCY > 1 el estado de sesiones requiere SESSION_STATE_BACKEND=redis")
+        return SessionStateCache(settings.SESSION_STATE_FLUSH_INTERVAL, settings.SESSION_STATE_MAX_ENTRIES)
+    elif backend == "redis":
+        return RedisSessionStateCache(
+            settings.SESSION_STATE_FLUSH_INTERVAL, settings.REDIS_URL, settings.SESSION_STATE_TTL
+        )
+    else:
+        raise ValueError(f"Backend de estado de sesiones no soportado: {backend}")
+
+def get_session_state_cache(request: Request) -> SessionStateCache:
+    """Dependency para obtener la caché de estado de sesiones de la aplicación"""
+    return request.app.state.session_state
@@ -0,0 +1,196 @@
+"""
+Generación del resumen final en segundo plano
+Pool de workers que generan el resumen, lo guardan en el brief y avisan a quien espera
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+from fastapi import Request
+from sqlalchemy import insert, select, update
+import structlog
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.deadline import Deadline
+from app.core.metrics import SUMMARY_FALLBACKS
+from app.models.brief import ProjectBrief
+from app.models.chat import ChatMessage, ChatSession
+from app.services.session_state import SessionState, SessionStateCache
+
+logger = structlog.get_logger()
+
+class SummaryJob:
+    """Resumen pendiente de una sesión"""
+
+    __slots__ = ("job_id", "state", "brief_data")
+
+    def __init__(self, job_id: str, state: SessionState, brief_data: Dict[str, Any]):
+        self.job_id = job_id
+        self.state = state
+        self.brief_data = brief_data
+
+class SummaryJobQueue:
+    """Cola en memoria atendida por ``workers`` tareas del event loop
+
+    Al arrancar vuelve a encolar los briefs que quedaron en ``pending`` (por
+    ejemplo tras un reinicio), así que ningún resumen se pierde. Con varios
+    procesos el mismo trabajo puede encolarse en todos: cada worker lo reclama
+    pasando el brief de ``pending`` a ``running`` y solo lo genera quien gana.
+    Si falla se guarda el resumen simple marcado como degradado.
+    """
+
+    def __init__(self, chat_service, state_cache: SessionStateCache, workers: int):
+        self.chat_service = chat_service
+        self.state_cache = state_cache
+        self.workers = workers
+        self._queue: "asyncio.Queue[SummaryJob]" = asyncio.Queue()
+        self._events: Dict[str, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._running: Set[str] = set()
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, job: SummaryJob):
+        """Encolar un resumen; el brief ya debe estar guardado como ``pending``"""
+        self._events.setdefault(job.job_id, asyncio.Event())
+        self._queue.put_nowait(job)
+        logger.info("Resumen encolado", job_id=job.job_id, session_id=job.state.session_id)
+
+    async def wait(self, job_id: str, timeout: float) -> bool:
+        """Esperar a que termine un trabajo de este proceso; False si no terminó a tiempo"""
+        event = self._events.get(job_id)
+        if event is None:
+            # Trabajo de otro proceso o ya terminado: quien llama consulta la base de datos
+            await asyncio.sleep(timeout)
+            return False
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def start(self):
+        """Arrancar los workers y reanudar los resúmenes pendientes"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        for job in await self._pending_jobs():
+            self.submit(job)
+
+    async def stop(self):
+        """Detener los workers; lo pendiente sigue marcado en la base de datos"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._running:
+            # Devolver a ``pending`` lo reclamado y no terminado para el próximo arranque
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(ProjectBrief)
+                    .where(
+                        ProjectBrief.summary_job_id.in_(self._running),
+                        ProjectBrief.summary_status == "running"
+                    )
+                    .values(summary_status="pending")
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            self._running.clear()
+
+    async def _pending_jobs(self) -> List[SummaryJob]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ProjectBrief, ChatSession)
+                .join(ChatSession, ChatSession.session_id == ProjectBrief.session_id)
+                .where(ProjectBrief.summary_status == "pending")
+            )
+            return [
+                SummaryJob(brief.summary_job_id, SessionState.from_model(session), brief.brief_data())
+                for brief, session in result.all()
+            ]
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                self.failed += 1
+                logger.error("Error generando resumen en segundo plano", job_id=job.job_id, error=str(e))
+                await self._fallback(job)
+            finally:
+                self._queue.task_done()
+                # Despertar a quien espera; si falló, leerá el estado en la base de datos
+                event = self._events.pop(job.job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def _run(self, job: SummaryJob):
+        if not await _claim(job):
+            logger.info("Resumen reclamado por otro worker", job_id=job.job_id)
+            return
+        self._running.add(job.job_id)
+        result = await self.chat_service.summarize(job.brief_data, Deadline(settings.SUMMARY_JOB_TIMEOUT))
+        await _save_summary(job, result)
+        await self.state_cache.update(job.state, current_step="done", current_question_key=None)
+        self._running.discard(job.job_id)
+        self.completed += 1
+        logger.info("Resumen generado", job_id=job.job_id, degraded=result.get("degraded", False))
+
+    async def _fallback(self, job: SummaryJob):
+        """Guardar el resumen simple para que la sesión no quede en ``summarizing``"""
+        if job.job_id not in self._running:
+            return
+        try:
+            result = {**self.chat_service._generate_simple_summary(job.brief_data), "degraded": True}
+            await _save_summary(job, result)
+            await self.state_cache.update(job.state, current_step="done", current_question_key=None)
+            SUMMARY_FALLBACKS.labels("all").inc()
+        except Exception as e:
+            logger.error("Error guardando el resumen simple", job_id=job.job_id, error=str(e))
+        finally:
+            self._running.discard(job.job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize(),
+            "waiting": len(self._events),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+async def _claim(job: SummaryJob) -> bool:
+    """Pasar el brief de ``pending`` a ``running``; False si otro worker ya lo tiene"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(ProjectBrief)
+            .where(ProjectBrief.summary_job_id == job.job_id, ProjectBrief.summary_status == "pending")
+            .values(summary_status="running")
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount > 0
+
+async def _save_summary(job: SummaryJob, result: Dict[str, Any]):
+    """Guardar el resumen en el brief y el mensaje final en el historial en una transacción"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(ProjectBrief)
+            .where(ProjectBrief.summary_job_id == job.job_id)
+            .values(
+                summary=result.get("summary"),
+                suggestions=result.get("suggestions"),
+                summary_status="done",
+                summary_degraded=result.get("degraded", False)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(insert(ChatMessage).values(
+            session_id=job.state.id, role="bot", content=result["message"]
+        ))
+        await db.commit()
+
+def get_summary_jobs(request: Request) -> SummaryJobQueue:
+    """Dependency para obtener la cola de resúmenes de la aplicación"""
+    return request.app.state.summary_jobs
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Commits y sentencias SQL por turno de /chat/stream
+
+Recorre una conversación completa contra la aplicación en proceso con un
+LLM falso y cuenta, para cada turno, los COMMIT y las sentencias emitidas.
+La escritura por lotes del estado de sesiones se excluye (se ejecuta al
+cerrar la aplicación).
+
+Uso:
+    python benchmarks/bench_commits.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SESSION_STATE_FLUSH_INTERVAL"] = "3600"
+
+import httpx
+from sqlalchemy import event
+
+from benchmarks.fake_llm import FakeLLM, FakeRegistry
+from benchmarks.conversation import MESSAGES
+
+async def run():
+    from main import app
+    from app.core.database import engine
+    from app.services.chat_service import ChatService
+    from app.services.llm_service import LLMService
+
+    counters = {"commits": 0, "statements": 0}
+
+    def on_commit(conn):
+        counters["commits"] += 1
+
+    def on_statement(conn, cursor, statement, parameters, context, executemany):
+        counters["statements"] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        app.state.chat_service = ChatService(LLMService(registry=FakeRegistry(FakeLLM(latency=0))))
+        event.listen(engine.sync_engine, "commit", on_commit)
+        event.listen(engine.sync_engine, "before_cursor_execute", on_statement)
+
+        print(f"{'turno':<6}{'step':<10}{'commits':>8}{'sentencias':>12}")
+        totals = {"commits": 0, "statements": 0}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for i, message in enumerate(MESSAGES, start=1):
+                counters.update(commits=0, statements=0)
+                response = await client.post(
+                    "/chat/stream",
+                    json={"message": message, "session_id": "bench_commits", "device_token": "bench"}
+                )
+                response.raise_for_status()
+                step = response.json().get("step")
+                print(f"{i:<6}{step:<10}{counters['commits']:>8}{counters['statements']:>12}")
+                for key in totals:
+                    totals[key] += counters[key]
+
+        event.remove(engine.sync_engine, "commit", on_commit)
+        event.remove(engine.sync_engine, "before_cursor_execute", on_statement)
+
+    turns = len(MESSAGES)
+    print(f"\nMedia por turno: {totals['commits'] / turns:.2f} commits, "
+          f"{totals['statements'] / turns:.2f} sentencias")
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput concurrente de /chat/stream con un LLM lento
+
+Compara un LLM que bloquea el event loop (como ``llm.invoke``) con uno
+asíncrono (``ainvoke``). Cada sesión recorre el flujo completo hasta el
+resumen final, que es el turno que llama al LLM.
+
+Uso:
+    python benchmarks/bench_concurrency.py --sessions 20 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Base de datos temporal antes de importar la aplicación
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx
+
+from benchmarks.conversation import MESSAGES
+from benchmarks.fake_llm import FakeLLM, FakeRegistry
+
+async def run_session(client: httpx.AsyncClient, index: int, run: str):
+    """Recorrer una conversación completa"""
+    session_id = f"bench_{run}_{index}"
+    for message in MESSAGES:
+        response = await client.post(
+            "/chat/stream",
+            json={"message": message, "session_id": session_id, "device_token": "bench"}
+        )
+        response.raise_for_status()
+
+async def run_benchmark(sessions: int, latency: float, blocking: bool) -> float:
+    """Ejecutar ``sessions`` conversaciones concurrentes y devolver el tiempo total"""
+    from main import app
+    from app.services.chat_service import ChatService
+    from app.services.llm_service import LLMService
+
+    llm = FakeLLM(latency=latency, blocking=blocking)
+    run = "blocking" if blocking else "async"
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        app.state.chat_service = ChatService(LLMService(registry=FakeRegistry(llm)))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(run_session(client, i, run) for i in range(sessions)))
+            return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="Latencia del LLM falso en segundos")
+    args = parser.parse_args()
+
+    turns = args.sessions * len(MESSAGES)
+    print(f"🧪 {args.sessions} sesiones concurrentes, {turns} turnos, latencia LLM {args.latency}s")
+    for blocking in (True, False):
+        elapsed = asyncio.run(run_benchmark(args.sessions, args.latency, blocking))
+        label = "invoke bloqueante" if blocking else "ainvoke asíncrono"
+        print(f"  {label:<18} {elapsed:7.2f}s  {turns / elapsed:8.1f} turnos/s")
+
+if __name__ == "__main__":
+    main()
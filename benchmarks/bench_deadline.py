@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Latencia del turno de resumen con un proveedor que no responde
+
+Configura ``CHAT_TIMEOUT`` corto y un LLM falso que tarda mucho más. Cada
+sesión recorre el flujo completo; se mide el turno final (el que llama al
+LLM) y se comprueba que termina dentro del plazo con ``degraded=True``.
+
+Uso:
+    python benchmarks/bench_deadline.py --sessions 20 --timeout 2 --latency 60
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx
+
+from app.core.config import settings
+from benchmarks.conversation import MESSAGES
+from benchmarks.fake_llm import FakeLLM, FakeRegistry
+
+async def run_session(client: httpx.AsyncClient, index: int, stream: bool) -> tuple:
+    """Recorrer una conversación y devolver latencia y ``degraded`` del último turno"""
+    session_id = f"deadline_{'sse' if stream else 'json'}_{index}"
+    headers = {"Accept": "text/event-stream"} if stream else {}
+    for message in MESSAGES:
+        start = time.perf_counter()
+        response = await client.post(
+            "/chat/stream",
+            json={"message": message, "session_id": session_id, "device_token": "bench"},
+            headers=headers
+        )
+        response.raise_for_status()
+        elapsed = time.perf_counter() - start
+    degraded = '"degraded": true' in response.text if stream else response.json()["degraded"]
+    return elapsed, degraded
+
+async def run(sessions: int, latency: float, stream: bool):
+    from main import app
+    from app.services.chat_service import ChatService
+    from app.services.llm_service import LLMService
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        app.state.chat_service = ChatService(LLMService(registry=FakeRegistry(FakeLLM(latency=latency))))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            return await asyncio.gather(*(run_session(client, i, stream) for i in range(sessions)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--timeout", type=int, default=2, help="CHAT_TIMEOUT en segundos")
+    parser.add_argument("--latency", type=float, default=60.0, help="Latencia del LLM falso en segundos")
+    args = parser.parse_args()
+
+    settings.CHAT_TIMEOUT = args.timeout
+    print(f"🧪 {args.sessions} sesiones, CHAT_TIMEOUT={args.timeout}s, latencia LLM {args.latency}s")
+    failures = 0
+    for stream in (False, True):
+        results = asyncio.run(run(args.sessions, args.latency, stream))
+        latencies = sorted(elapsed for elapsed, _ in results)
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+        degraded = sum(1 for _, flag in results if flag)
+        ok = p99 <= args.timeout and degraded == len(results)
+        failures += not ok
+        label = "SSE" if stream else "JSON"
+        print(f"  {'✅' if ok else '❌'} {label:<5} p99={p99:.2f}s degradadas={degraded}/{len(results)}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Coste de los logs por petición
+
+Emite los tres eventos info de un turno de chat ("Procesando mensaje",
+"Respuesta procesada", "Respuesta de chat generada") y mide el tiempo que
+pasan en el hilo de la petición con escritura síncrona, con la cola y el
+hilo escritor, y con muestreo. ``--write-latency`` simula un stdout lento
+(por ejemplo el driver de logs del contenedor).
+
+Uso:
+    python benchmarks/bench_logging.py --requests 20000
+    python benchmarks/bench_logging.py --requests 2000 --write-latency 0.0005
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import structlog
+
+from app.core import logging as app_logging
+
+SAMPLING = "Procesando mensaje=0.1,Respuesta procesada=0.1,Respuesta de chat generada=0.1"
+
+class SlowStream:
+    """Stream de salida con latencia fija por escritura"""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, data: str):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+def run(requests: int, stream, async_mode: bool, sampling: str = "") -> float:
+    """Microsegundos por petición en el hilo que emite los logs"""
+    app_logging.setup_logging(async_mode=async_mode, stream=stream, sampling=sampling)
+    logger = structlog.get_logger("bench")
+    start = time.perf_counter()
+    for i in range(requests):
+        session_id = f"bench_{i % 100}"
+        logger.info("Procesando mensaje", step="asking", question_key="audience", message_length=42)
+        logger.info("Respuesta procesada", step="asking", next_key="use_cases", degraded=False)
+        logger.info("Respuesta de chat generada", session_id=session_id)
+    elapsed = time.perf_counter() - start
+    app_logging.shutdown_logging()
+    return elapsed / requests * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--write-latency", type=float, default=0.0, help="Segundos por escritura en el stream")
+    args = parser.parse_args()
+
+    orjson = app_logging.orjson
+    with tempfile.TemporaryFile("w") as f:
+        stream = SlowStream(f, args.write_latency)
+        scenarios = [("síncrono, json", False, "", None)]
+        if orjson is not None:
+            scenarios.append(("síncrono, orjson", False, "", orjson))
+        renderer = "orjson" if orjson is not None else "json"
+        scenarios += [
+            (f"cola, {renderer}", True, "", orjson),
+            (f"cola, {renderer}, muestreo 10%", True, SAMPLING, orjson),
+        ]
+
+        print(f"🧪 {args.requests} peticiones, 3 eventos por petición, escritura {args.write_latency * 1000:.2f} ms")
+        for label, async_mode, sampling, serializer in scenarios:
+            app_logging.orjson = serializer
+            per_request = run(args.requests, stream, async_mode, sampling)
+            stats = app_logging.logging_stats()
+            print(f"  {label:<28} {per_request:8.1f} µs/petición  descartados={stats['dropped']}")
+        app_logging.orjson = orjson
+
+if __name__ == "__main__":
+    main()
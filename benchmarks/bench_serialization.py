@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Coste de serializar las respuestas de chat, brief, lead e historial
+
+Monta los mismos tipos de respuesta que la API sobre objetos en memoria (sin
+base de datos) y llama a la aplicación ASGI directamente, con la ruta por
+defecto de FastAPI (validación + jsonable_encoder + json.dumps) y con
+``FAST_JSON_RESPONSES`` (bytes de ``to_json`` con orjson), y comprueba que
+las dos rutas devuelven el mismo JSON, también con fechas con zona horaria.
+
+Uso:
+    python benchmarks/bench_serialization.py --iterations 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.core.responses import default_response_class, model_response, orjson
+from app.models.brief import ProjectBrief
+from app.models.chat import ChatMessage
+from app.models.lead import Lead
+from app.schemas.chat import ChatHistoryResponse, ChatMessageResponse, ChatResponse
+
+NOW = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+BRIEF = ProjectBrief(
+    id=1, business_goal="Quiero crear una plataforma de e-commerce", audience="Empresas pequeñas y medianas",
+    use_cases=["Catálogo de productos", "Carrito de compras", "Sistema de pagos"],
+    data_sources=["Base de datos de productos en Excel"], integrations=["PayPal", "Stripe", "Inventario"],
+    constraints=[], budget_range="30–80k", timeline="6 meses", created_at=NOW, updated_at=NOW
+)
+LEAD = Lead(
+    id=1, brief_id=1, name="Ana", email="ana@example.com", company="Tienda SA",
+    contact_info={"phone": "+34 600 000 000", "preferred": "email"}, status="new", priority="medium",
+    created_at=NOW, updated_at=NOW
+)
+def chat_messages(start: datetime):
+    return [
+        ChatMessage(id=i, session_id=1, role="user" if i % 2 else "bot",
+                    content="Mensaje de la conversación número %d con algo de texto" % i,
+                    created_at=start + timedelta(seconds=i))
+        for i in range(50)
+    ]
+
+MESSAGES = chat_messages(NOW)
+# Las fechas de PostgreSQL (timestamptz) llegan con zona horaria
+MESSAGES_TZ = chat_messages(NOW.replace(tzinfo=timezone.utc))
+PATHS = ("/chat", "/brief", "/lead", "/history", "/history-tz")
+CHAT = ChatResponse(
+    message="¡Excelente! Hemos recopilado toda la información necesaria. " * 4,
+    step="done",
+    summary="**Objetivo:** Plataforma de e-commerce para pymes. " * 6,
+    suggestions=["1. MVP Básico", "2. MVP Avanzado", "3. Solución Completa"]
+)
+
+def create_app() -> FastAPI:
+    app = FastAPI(default_response_class=default_response_class())
+
+    @app.get("/chat", response_model=ChatResponse)
+    async def chat():
+        return model_response(CHAT)
+
+    @app.get("/brief")
+    async def brief():
+        return model_response(BRIEF)
+
+    @app.get("/lead")
+    async def lead():
+        return model_response(LEAD)
+
+    def history_response(messages):
+        page = {"next_cursor": str(messages[-1].id), "prev_cursor": None, "has_more": False}
+        return model_response(
+            ChatHistoryResponse(messages=[ChatMessageResponse.model_validate(m) for m in messages], **page)
+        )
+
+    @app.get("/history", response_model=ChatHistoryResponse)
+    async def history():
+        return history_response(MESSAGES)
+
+    @app.get("/history-tz", response_model=ChatHistoryResponse)
+    async def history_tz():
+        return history_response(MESSAGES_TZ)
+
+    return app
+
+async def call(app: FastAPI, path: str) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+async def measure(app: FastAPI, path: str, iterations: int) -> float:
+    """Microsegundos por respuesta"""
+    for _ in range(100):
+        await call(app, path)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await call(app, path)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+async def run(iterations: int):
+    results, bodies = {}, {}
+    for fast in (False, True):
+        settings.FAST_JSON_RESPONSES = fast
+        app = create_app()
+        for path in PATHS:
+            bodies[(path, fast)] = json.loads(await call(app, path))
+            results[(path, fast)] = await measure(app, path, iterations)
+    return results, bodies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"🧪 {args.iterations} respuestas por caso, serializador rápido: {'orjson' if orjson else 'json'}")
+    print(f"  {'ruta':<12}{'por defecto':>12}{'rápida':>12}{'mejora':>10}")
+    results, bodies = asyncio.run(run(args.iterations))
+    mismatched = [path for path in PATHS if bodies[(path, False)] != bodies[(path, True)]]
+    for path in PATHS:
+        default, fast = results[(path, False)], results[(path, True)]
+        mark = "  ❌ JSON distinto" if path in mismatched else ""
+        print(f"  {path:<12}{default:>9.1f} µs{fast:>9.1f} µs{default / fast:>9.2f}x{mark}")
+    sys.exit(1 if mismatched else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Llamadas al proveedor con prompts idénticos simultáneos
+
+Lanza ``--requests`` llamadas concurrentes con el mismo prompt de
+sugerencias (y unas pocas distintas) contra un LLM falso, con y sin
+single-flight, y cuenta cuántas llegan al proveedor. La caché persistente
+se desactiva para medir solo la coalescencia.
+
+Uso:
+    python benchmarks/bench_singleflight.py --requests 200 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import FakeLLM, FakeRegistry
+
+async def run(requests: int, distinct: int, latency: float, single_flight: bool):
+    from app.services.chat_service import ChatService
+    from app.core.config import settings
+    from app.services.llm_router import LLMRouter
+    from app.services.llm_scheduler import LLMScheduler
+    from app.services.llm_service import LLMService
+
+    llm = FakeLLM(latency=latency, responses="1. MVP Básico\n2. MVP Avanzado\n3. Solución Completa")
+    registry = FakeRegistry(llm)
+    # Sin límite de concurrencia: solo se mide la coalescencia, no el descarte de carga
+    router = LLMRouter(registry, [settings.DEFAULT_LLM_PROVIDER], scheduler=LLMScheduler(requests, requests))
+    service = LLMService(registry=registry, router=router, single_flight=single_flight)
+    chat = ChatService(service)
+    briefs = [{"business_goal": f"Tienda online {i % distinct}", "budget_range": "10–30k"} for i in range(requests)]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(chat._ask_llm(chat._create_suggestions_prompt(brief)) for brief in briefs))
+    elapsed = time.perf_counter() - start
+    assert all(result == llm.responses for result in results)
+    return llm.calls, service.coalesced, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=5, help="Prompts distintos entre las peticiones")
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"🧪 {args.requests} peticiones concurrentes, {args.distinct} prompts distintos")
+    for single_flight in (False, True):
+        calls, coalesced, elapsed = asyncio.run(run(args.requests, args.distinct, args.latency, single_flight))
+        label = "single-flight" if single_flight else "sin coalescer"
+        print(f"  {label:<14} llamadas al proveedor={calls:<5} coalescidas={coalesced:<5} {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
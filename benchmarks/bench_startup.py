@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Arranque en frío de un worker: tiempo de import y memoria
+
+Lanza ``--runs`` procesos nuevos que importan ``main`` (como hace cada worker
+de uvicorn) y, con ``--lifespan``, ejecutan también el arranque de la
+aplicación (migraciones y servicios). Muestra la mediana del tiempo y del RSS,
+los paquetes que más tardan en importarse (``python -X importtime``) y si se
+cargaron los SDK de los proveedores, que deben importarse en el primer uso.
+
+Uso:
+    python benchmarks/bench_startup.py --runs 5 --lifespan
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROVIDER_MODULES = ("langchain_core", "langchain_groq", "langchain_openai", "groq", "openai", "tiktoken")
+
+WORKER = """
+import json, os, sys, time
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+result = {"rss_base_mb": rss_mb()}
+start = time.perf_counter()
+import main
+result["import_s"] = time.perf_counter() - start
+result["rss_import_mb"] = rss_mb()
+if %(lifespan)r:
+    import asyncio
+
+    async def startup():
+        async with main.app.router.lifespan_context(main.app):
+            pass
+
+    start = time.perf_counter()
+    asyncio.run(startup())
+    result["lifespan_s"] = time.perf_counter() - start
+    result["rss_lifespan_mb"] = rss_mb()
+result["provider_modules"] = [name for name in %(modules)r if name in sys.modules]
+print(json.dumps(result))
+"""
+
+def run_worker(lifespan: bool, env: dict) -> tuple:
+    """Resultado del worker y tiempos de import propios por módulo (µs)"""
+    code = WORKER % {"lifespan": lifespan, "modules": PROVIDER_MODULES}
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    self_times = Counter()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        self_times[name.strip().split(".")[0]] += int(own)
+    return json.loads(process.stdout.strip().splitlines()[-1]), self_times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--lifespan", action="store_true", help="Medir también el arranque de la aplicación")
+    parser.add_argument("--top", type=int, default=10, help="Paquetes más lentos a mostrar")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+
+    print(f"🧪 {args.runs} workers en frío{' con lifespan' if args.lifespan else ''}")
+    results, packages = [], Counter()
+    for _ in range(args.runs):
+        result, self_times = run_worker(args.lifespan, env)
+        results.append(result)
+        packages.update(self_times)
+
+    def median(key: str) -> float:
+        return statistics.median(result[key] for result in results)
+
+    print(f"  import main        {median('import_s') * 1000:>8.0f} ms   RSS {median('rss_import_mb'):.1f} MB "
+          f"(intérprete {median('rss_base_mb'):.1f} MB)")
+    if args.lifespan:
+        print(f"  lifespan           {median('lifespan_s') * 1000:>8.0f} ms   RSS {median('rss_lifespan_mb'):.1f} MB")
+    loaded = sorted({name for result in results for name in result["provider_modules"]})
+    print(f"  SDK de proveedores cargados al arrancar: {', '.join(loaded) if loaded else 'ninguno'}")
+
+    print(f"\n  {'paquete':<24}{'import (ms)':>12}")
+    for name, total in packages.most_common(args.top):
+        print(f"  {name:<24}{total / args.runs / 1000:>12.1f}")
+
+if __name__ == "__main__":
+    main()
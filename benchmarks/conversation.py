@@ -0,0 +1,27 @@
+"""
+Conversación de referencia para los benchmarks (mismo flujo que test_chat.py)
+"""
+
+MESSAGES = [
+    "inicio",
+    "Quiero crear una plataforma de e-commerce",
+    "Empresas pequeñas y medianas",
+    "Catálogo de productos, carrito de compras, sistema de pagos",
+    "Tenemos una base de datos de productos en Excel",
+    "PayPal, Stripe, sistema de inventario",
+    "Entre 30-80k",
+    "6 meses",
+]
+
+# Los 9 mensajes de test_chat.py tal cual, incluida la confirmación tras "inicio"
+TEST_CHAT_MESSAGES = [
+    "inicio",
+    "Sí, estoy listo",
+    "Quiero crear una plataforma de e-commerce",
+    "Empresas pequeñas y medianas",
+    "Catálogo de productos, carrito de compras, sistema de pagos",
+    "Tenemos una base de datos de productos en Excel",
+    "PayPal, Stripe, sistema de inventario",
+    "Entre 30-80k",
+    "6 meses",
+]
@@ -0,0 +1,23 @@
+"""
+Registro de LLM falsos para benchmarks
+Inyecta instancias de ``FakeLLM`` (app/services/fake_llm.py) ya configuradas en el LLMService
+"""
+
+from app.services.fake_llm import FakeLLM
+
+class FakeRegistry:
+    """Registro que devuelve el mismo LLM falso, o uno por proveedor si ``llm`` es un dict"""
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def get(self, provider=None, model=None, temperature=0.7):
+        if isinstance(self.llm, dict):
+            return self.llm[provider]
+        return self.llm
+
+    def default_model(self, provider):
+        return "fake"
+
+    def clear(self):
+        pass
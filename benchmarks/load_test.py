@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del flujo de chat contra la aplicación en proceso
+
+Repite la conversación de 9 mensajes de ``test_chat.py`` en ``--sessions``
+sesiones simuladas (``--concurrency`` a la vez) con un LLM falso de latencia
+y jitter configurables. Mide throughput, p50/p95/p99 por paso del chat,
+commits por turno y crecimiento de memoria, y guarda el resultado en JSON
+para compararlo con otra ejecución.
+
+Uso:
+    python benchmarks/load_test.py --sessions 200 --concurrency 50 --output base.json
+    python benchmarks/load_test.py --sessions 200 --concurrency 50 --output nuevo.json --compare base.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'load.db')}"
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+from sqlalchemy import event
+
+from benchmarks.conversation import TEST_CHAT_MESSAGES
+from benchmarks.fake_llm import FakeLLM, FakeRegistry
+
+def rss_mb() -> float:
+    """Memoria residente actual del proceso en MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        # Sin /proc: máximo de la ejecución (KB en Linux, bytes en macOS)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def latency_summary(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.50), 4),
+        "p95": round(percentile(values, 0.95), 4),
+        "p99": round(percentile(values, 0.99), 4),
+        "max": round(max(values), 4),
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class LoadRun:
+    """Sesiones simuladas y contadores de una ejecución"""
+
+    def __init__(self, client: httpx.AsyncClient, stream: bool):
+        self.client = client
+        self.stream = stream
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Counter = Counter()
+        self.turns = 0
+
+    async def turn(self, session_id: str, message: str) -> Optional[Dict[str, Any]]:
+        headers = {"Accept": "text/event-stream"} if self.stream else {}
+        response = await self.client.post(
+            "/chat/stream",
+            json={"message": message, "session_id": session_id, "device_token": session_id},
+            headers=headers
+        )
+        self.statuses[response.status_code] += 1
+        self.turns += 1
+        if response.status_code != 200:
+            return None
+        if not self.stream:
+            return response.json()
+        # Con SSE el resultado del turno es el evento final
+        final = response.text.rsplit("event: final\ndata: ", 1)
+        return json.loads(final[1].split("\n", 1)[0]) if len(final) == 2 else None
+
+    async def session(self, index: int, semaphore: asyncio.Semaphore):
+        session_id = f"load_{index}"
+        async with semaphore:
+            label = "intro"
+            for message in TEST_CHAT_MESSAGES:
+                start = time.perf_counter()
+                data = await self.turn(session_id, message)
+                self.latencies[label].append(time.perf_counter() - start)
+                if data is None:
+                    return
+                # El siguiente turno responde a la pregunta que acaba de hacerse
+                step = data.get("step") or "unknown"
+                label = f"{step}:{data['current_key']}" if data.get("current_key") else step
+
+async def run(args) -> Dict[str, Any]:
+    from main import app
+    from app.core.database import engine
+    from app.services.chat_service import ChatService
+    from app.services.llm_service import LLMService
+
+    commits = 0
+
+    def on_commit(conn):
+        nonlocal commits
+        commits += 1
+
+    llm = FakeLLM(latency=args.latency, jitter=args.jitter, tokens_per_second=args.tokens_per_second, seed=args.seed)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        # Todas las sesiones envían el mismo brief: sin --single-flight cada resumen llama al LLM
+        app.state.chat_service = ChatService(LLMService(registry=FakeRegistry(llm), single_flight=args.single_flight))
+        app.state.summary_jobs.chat_service = app.state.chat_service
+        event.listen(engine.sync_engine, "commit", on_commit)
+        gc.collect()
+        rss_start = rss_mb()
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+            load = LoadRun(client, args.sse)
+            semaphore = asyncio.Semaphore(args.concurrency)
+            start = time.perf_counter()
+            await asyncio.gather(*(load.session(i, semaphore) for i in range(args.sessions)))
+            elapsed = time.perf_counter() - start
+        gc.collect()
+        rss_end = rss_mb()
+        event.remove(engine.sync_engine, "commit", on_commit)
+
+    all_latencies = [value for values in load.latencies.values() for value in values]
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "messages_per_session": len(TEST_CHAT_MESSAGES),
+            "llm_latency": args.latency,
+            "llm_jitter": args.jitter,
+            "llm_tokens_per_second": args.tokens_per_second,
+            "seed": args.seed,
+            "sse": args.sse,
+            "single_flight": args.single_flight,
+            "summary_mode": os.environ.get("SUMMARY_MODE", "sync"),
+        },
+        "duration_s": round(elapsed, 3),
+        "turns": load.turns,
+        "throughput_turns_s": round(load.turns / elapsed, 2),
+        "throughput_sessions_s": round(args.sessions / elapsed, 2),
+        "status_codes": {str(code): count for code, count in sorted(load.statuses.items())},
+        "errors": sum(count for code, count in load.statuses.items() if code != 200),
+        "latency": latency_summary(all_latencies),
+        "latency_by_step": {label: latency_summary(values) for label, values in load.latencies.items()},
+        "llm_calls": llm.calls,
+        "db_commits": commits,
+        "db_commits_per_turn": round(commits / load.turns, 3) if load.turns else 0.0,
+        "memory": {
+            "rss_start_mb": round(rss_start, 1),
+            "rss_end_mb": round(rss_end, 1),
+            "rss_growth_mb": round(rss_end - rss_start, 1),
+        },
+    }
+
+def print_report(result: Dict[str, Any]):
+    print(f"  {result['turns']} turnos en {result['duration_s']}s: {result['throughput_turns_s']} turnos/s, "
+          f"errores={result['errors']} {result['status_codes']}")
+    print(f"  commits por turno={result['db_commits_per_turn']}  llamadas LLM={result['llm_calls']}  "
+          f"RSS {result['memory']['rss_start_mb']} -> {result['memory']['rss_end_mb']} MB")
+    print(f"  {'paso':<28}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+    rows = sorted(result["latency_by_step"].items(), key=lambda item: -item[1]["p50"])
+    for label, stats in [("total", result["latency"])] + rows:
+        print(f"  {label:<28}{stats['count']:>6}{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}")
+
+def print_comparison(result: Dict[str, Any], baseline: Dict[str, Any]):
+    """Diferencias relativas con una ejecución anterior"""
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\n📊 Comparado con {baseline.get('git_revision') or 'base'} ({baseline.get('created_at')}):")
+    metrics = [
+        ("turnos/s", result["throughput_turns_s"], baseline["throughput_turns_s"]),
+        ("p50", result["latency"]["p50"], baseline["latency"]["p50"]),
+        ("p95", result["latency"]["p95"], baseline["latency"]["p95"]),
+        ("p99", result["latency"]["p99"], baseline["latency"]["p99"]),
+        ("commits por turno", result["db_commits_per_turn"], baseline["db_commits_per_turn"]),
+        ("crecimiento RSS MB", result["memory"]["rss_growth_mb"], baseline["memory"]["rss_growth_mb"]),
+    ]
+    for label, new, old in metrics:
+        print(f"  {label:<20}{old:>10} -> {new:<10} {delta(new, old)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=25, help="Sesiones simultáneas")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia media del LLM falso en segundos")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Variación uniforme de la latencia en segundos")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Ritmo del streaming del LLM falso; 0: de golpe")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de las latencias del LLM falso")
+    parser.add_argument("--sse", action="store_true", help="Pedir las respuestas como Server-Sent Events")
+    parser.add_argument("--single-flight", action="store_true", help="Coalescer los prompts idénticos de las sesiones")
+    parser.add_argument("--output", default="load_test_results.json", help="Fichero JSON con el resultado")
+    parser.add_argument("--compare", help="Resultado JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    print(f"🧪 {args.sessions} sesiones x {len(TEST_CHAT_MESSAGES)} mensajes, concurrencia {args.concurrency}, "
+          f"LLM {args.latency}s ± {args.jitter}s")
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultado guardado en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(result, json.load(f))
+
+    sys.exit(1 if result["errors"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Scrape local de /metrics
+
+Arranca la aplicación en proceso con un LLM falso, recorre conversaciones
+completas y comprueba que ``GET /metrics`` expone las métricas de ruta,
+paso del chat, LLM (latencia y tokens) y base de datos. Después repite
+``--sse-sessions`` conversaciones por Server-Sent Events y comprueba que las
+llamadas en streaming al LLM también se cuentan.
+
+Uso:
+    python benchmarks/scrape_metrics.py --sessions 5 --sse-sessions 2
+    python benchmarks/scrape_metrics.py --print
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["METRICS_ENABLED"] = "true"
+
+import httpx
+
+from benchmarks.conversation import MESSAGES
+from benchmarks.fake_llm import FakeLLM, FakeRegistry
+
+EXPECTED = (
+    'http_request_duration_seconds_count{method="POST",route="/chat/stream",status="200"}',
+    'chat_turn_duration_seconds_count{step="intro"}',
+    'chat_turn_duration_seconds_count{step="asking"}',
+    "llm_request_duration_seconds_count{",
+    "llm_prompt_tokens_total{",
+    "llm_completion_tokens_total{",
+    'db_statement_duration_seconds_count{operation="SELECT"}',
+    'db_statement_duration_seconds_count{operation="INSERT"}',
+    "chat_active_sessions ",
+)
+
+async def run_session(client: httpx.AsyncClient, index: int, sse: bool = False):
+    session_id = f"metrics_{'sse_' if sse else ''}{index}"
+    headers = {"Accept": "text/event-stream"} if sse else {}
+    for message in MESSAGES:
+        response = await client.post(
+            "/chat/stream",
+            json={"message": message, "session_id": session_id, "device_token": "bench"},
+            headers=headers
+        )
+        response.raise_for_status()
+
+def llm_calls(text: str) -> float:
+    """Total de llamadas al LLM registradas en la exposición"""
+    return sum(
+        float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith("llm_request_duration_seconds_count{")
+    )
+
+async def scrape(sessions: int, sse_sessions: int) -> tuple:
+    from main import app
+    from app.services.chat_service import ChatService
+    from app.services.llm_service import LLMService
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        app.state.chat_service = ChatService(LLMService(registry=FakeRegistry(FakeLLM(latency=0.05))))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await asyncio.gather(*(run_session(client, i) for i in range(sessions)))
+            response = await client.get("/metrics")
+            response.raise_for_status()
+            await asyncio.gather(*(run_session(client, i, sse=True) for i in range(sse_sessions)))
+            streamed = await client.get("/metrics")
+            streamed.raise_for_status()
+            return response.text, streamed.text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--sse-sessions", type=int, default=2, help="Conversaciones por Server-Sent Events")
+    parser.add_argument("--print", action="store_true", help="Mostrar la exposición completa")
+    args = parser.parse_args()
+
+    from app.core.metrics import metrics_enabled
+    if not metrics_enabled():
+        print("❌ prometheus-client no está instalado")
+        sys.exit(1)
+
+    text, streamed = asyncio.run(scrape(args.sessions, args.sse_sessions))
+    if args.print:
+        print(streamed)
+    missing = [name for name in EXPECTED if name not in text]
+    for name in EXPECTED:
+        print(f"  {'❌' if name in missing else '✅'} {name}")
+    sse_calls = llm_calls(streamed) - llm_calls(text)
+    sse_ok = sse_calls > 0 or not args.sse_sessions
+    print(f"  {'✅' if sse_ok else '❌'} llamadas al LLM en streaming: {sse_calls:.0f}")
+    sys.exit(1 if missing or not sse_ok else 0)
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,29 @@ Business Analyst Backend API
 Backend para el chatbot Business Analyst con integración de LLMs
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer
-import uvicorn
-import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from app.api import auth, chat, brief, leads
+from app.api import auth, chat, brief, leads, admin
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, run_in_db_thread
+from app.core.metrics import MetricsMiddleware, instrument_engine, metrics_enabled, render
+from app.core.profiling import ProfilingMiddleware, create_profile_store
+from app.core.responses import default_response_class
+from app.core.migrations import run_migrations
 from app.core.logging import setup_logging
+from app.core.rate_limit import RateLimitMiddleware, create_rate_limiter
+from app.services.llm_registry import LLMRegistry
+from app.services.llm_service import LLMService
+from app.services.chat_service import ChatService
+from app.services.llm_cache import create_llm_cache
+from app.services.llm_router import create_llm_router
+from app.services.llm_scheduler import create_llm_scheduler
+from app.services.session_state import create_session_state_cache
+from app.services.context_assembler import ContextAssembler
+from app.services.summary_jobs import SummaryJobQueue
 
 # Cargar variables de entorno
 load_dotenv()
@@ -21,8 +33,42 @@ load_dotenv()
 # Configurar logging
 setup_logging()
 
-# Crear tablas de base de datos
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crear los servicios compartidos del proceso"""
+    # Aplicar migraciones de base de datos
+    await run_in_db_thread(run_migrations)
+    
+    # Los clientes LLM se construyen en el primer uso
+    app.state.llm_registry = LLMRegistry()
+    app.state.llm_cache = create_llm_cache()
+    app.state.llm_scheduler = create_llm_scheduler()
+    app.state.llm_router = create_llm_router(app.state.llm_registry, scheduler=app.state.llm_scheduler)
+    app.state.chat_service = ChatService(LLMService(
+        registry=app.state.llm_registry,
+        cache=app.state.llm_cache,
+        router=app.state.llm_router
+    ))
+    app.state.context_assembler = ContextAssembler(
+        settings.LLM_CONTEXT_TOKEN_BUDGET, settings.LLM_CONTEXT_MAX_SESSIONS
+    )
+    app.state.session_state = create_session_state_cache()
+    await app.state.session_state.start()
+    app.state.summary_jobs = SummaryJobQueue(
+        app.state.chat_service, app.state.session_state, settings.SUMMARY_WORKERS
+    )
+    await app.state.summary_jobs.start()
+    app.state.rate_limiter = create_rate_limiter() if settings.RATE_LIMIT_ENABLED else None
+    yield
+    # Persistir el estado de sesiones pendiente antes de salir
+    await app.state.summary_jobs.stop()
+    await app.state.session_state.stop()
+    if app.state.rate_limiter:
+        await app.state.rate_limiter.close()
+    if app.state.llm_cache:
+        await app.state.llm_cache.close()
+    app.state.llm_registry.clear()
+    await engine.dispose()
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -30,9 +76,16 @@ app = FastAPI(
     description="API para el chatbot Business Analyst con integración de LLMs",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=default_response_class(),
+    lifespan=lifespan
 )
 
+# Limitar peticiones por IP y device_token antes de llegar a los endpoints; se registra
+# antes que CORS para que sus 429 también lleven las cabeceras CORS
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, paths=settings.rate_limit_paths_list)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -42,11 +95,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia por ruta y de las sentencias SQL para Prometheus
+if metrics_enabled():
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+
+# Perfilado de las peticiones marcadas con PROFILING_HEADER o muestreadas
+if settings.PROFILING_ENABLED:
+    app.state.profile_store = create_profile_store()
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=app.state.profile_store,
+        header=settings.PROFILING_HEADER,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval=settings.PROFILING_INTERVAL
+    )
+
 # Incluir routers
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
 app.include_router(brief.router, prefix="/brief", tags=["brief"])
 app.include_router(leads.router, prefix="/leads", tags=["leads"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
@@ -62,7 +132,14 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de exposición de Prometheus"""
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
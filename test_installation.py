@@ -86,13 +86,10 @@ def test_database():
     try:
         print("\nProbando base de datos...")
         
-        from app.core.database import engine, Base
-        from app.models.brief import ProjectBrief
-        from app.models.chat import ChatSession, ChatMessage
-        from app.models.lead import Lead
+        from app.core.migrations import run_migrations
         
-        # Crear tablas
-        Base.metadata.create_all(bind=engine)
+        # Crear tablas aplicando las migraciones
+        run_migrations()
         print("✅ Base de datos inicializada correctamente")
         
         return True
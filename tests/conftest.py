@@ -0,0 +1,19 @@
+"""
+Configuración común de los tests
+
+La configuración se lee al importar ``app``, así que la base de datos
+temporal y el proveedor falso se fijan aquí antes de cualquier import.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["DEFAULT_LLM_PROVIDER"] = "fake"
+os.environ["LLM_CACHE_BACKEND"] = "none"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,144 @@
+"""
+EXPLAIN QUERY PLAN de las consultas frecuentes
+
+Llena la base SQLite de los tests con ``EXPLAIN_ROWS`` mensajes de chat
+(50.000 por defecto), ejecuta las funciones de acceso a datos de la API y de
+los resúmenes en segundo plano capturando cada SELECT/UPDATE/DELETE emitido y
+comprueba que ninguna consulta recorre una tabla completa.
+
+Con 1M de mensajes:
+    EXPLAIN_ROWS=1000000 python -m pytest tests/test_explain_indexes.py
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+ROWS = int(os.environ.get("EXPLAIN_ROWS", "50000"))
+
+def database_path() -> str:
+    from app.core.config import settings
+    return settings.DATABASE_URL[len("sqlite:///"):]
+
+def populate(rows: int) -> int:
+    """Insertar datos sintéticos directamente con sqlite3; devuelve el id de sesión consultado"""
+    sessions = max(rows // 10, 1)
+    conn = sqlite3.connect(database_path())
+    offset = conn.execute("SELECT COALESCE(MAX(id), 0) FROM chat_sessions").fetchone()[0]
+    brief_offset = conn.execute("SELECT COALESCE(MAX(id), 0) FROM project_briefs").fetchone()[0]
+    lead_offset = conn.execute("SELECT COALESCE(MAX(id), 0) FROM leads").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO chat_sessions (id, session_id, device_token, current_step, last_activity) "
+        "VALUES (?, ?, ?, 'asking', datetime('now', ?))",
+        ((offset + i, f"explain_{i}", f"device_{i % 5000}", f"-{i % 86400} seconds") for i in range(1, sessions + 1))
+    )
+    conn.executemany(
+        "INSERT INTO chat_messages (session_id, role, content, created_at) "
+        "VALUES (?, ?, 'mensaje', datetime('now', ?))",
+        ((offset + random.randint(1, sessions), "user" if i % 2 else "bot", f"-{rows - i} seconds")
+         for i in range(rows))
+    )
+    conn.executemany(
+        "INSERT INTO project_briefs (id, session_id, device_token, business_goal, summary_status, summary_job_id) "
+        "VALUES (?, ?, ?, 'objetivo', ?, ?)",
+        ((brief_offset + i, f"explain_{i}", f"device_{i % 5000}", "pending" if i % 100 == 0 else "done",
+          f"explain_job_{i}") for i in range(1, sessions + 1))
+    )
+    conn.executemany(
+        "INSERT INTO leads (id, brief_id, status, priority) VALUES (?, ?, ?, ?)",
+        ((lead_offset + i, brief_offset + i, random.choice(["new", "contacted", "qualified"]),
+          random.choice(["low", "medium", "high"])) for i in range(1, sessions + 1))
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return sessions // 2
+
+async def exercise(index: int):
+    """Ejecutar las funciones de acceso a datos de la API y de los resúmenes"""
+    from app.core.database import AsyncSessionLocal
+    from app.api import chat, brief, leads
+    from app.services.session_state import SessionState, _write_states
+    from app.services.summary_jobs import SummaryJob, SummaryJobQueue, _claim, _save_summary
+
+    session_key = f"explain_{index}"
+    async with AsyncSessionLocal() as db:
+        session = await chat.get_chat_session(db, session_key)
+        state = SessionState.from_model(session)
+        await chat.get_current_brief_data(db, session_key)
+        await chat.save_chat_turn(db, state, "Pymes", {
+            "message": "¿Qué funcionalidades imaginas?",
+            "brief_update": {"audience": "Pymes"}
+        })
+        page = await chat.get_message_page(db, state.id, 51)
+        assert page
+        await chat.get_message_page(db, state.id, 51, cursor_id=page[-1].id)
+        await chat.get_message_page(db, state.id, 51, cursor_id=page[-1].id, forward=True)
+        await chat.get_session_brief(db, session_key)
+        await brief.get_brief(index, db)
+        await leads.get_lead(index, db)
+    await _write_states([{"id": state.id, "current_step": "asking", "current_question_key": "audience",
+                          "last_activity": None}])
+
+    # Resúmenes en segundo plano: recuperación al arrancar, reclamo y guardado por job_id
+    await SummaryJobQueue(None, None, 0)._pending_jobs()
+    job = SummaryJob(f"explain_job_{index}", state, {})
+    await _claim(job)
+    await _save_summary(job, {"message": "Resumen", "summary": "Resumen", "suggestions": []})
+
+@pytest.fixture(scope="module")
+def plans():
+    """Plan de cada sentencia emitida: [(sql, [pasos del plan])]"""
+    from app.core.database import engine
+    from app.core.migrations import run_migrations
+
+    run_migrations()
+    index = populate(ROWS)
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(" ", 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            captured.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        asyncio.run(exercise(index))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        asyncio.run(engine.dispose())
+
+    conn = sqlite3.connect(database_path())
+    try:
+        return [
+            (" ".join(statement.split()), [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)])
+            for statement, parameters in captured
+        ]
+    finally:
+        conn.close()
+
+def test_hot_queries_use_indexes(plans):
+    full_scans = [
+        (statement, plan) for statement, plan in plans
+        if any(step.startswith("SCAN ") and "CONSTANT ROW" not in step for step in plan)
+    ]
+    assert plans
+    assert not full_scans, "\n".join(f"{statement}\n    {plan}" for statement, plan in full_scans)
+
+@pytest.mark.parametrize("fragment", [
+    "FROM chat_sessions WHERE chat_sessions.session_id",
+    "FROM project_briefs WHERE project_briefs.session_id",
+    "FROM chat_messages WHERE chat_messages.session_id",
+    "WHERE project_briefs.summary_status",
+    "WHERE project_briefs.summary_job_id = ? AND project_briefs.summary_status",
+    "summary_degraded=?, updated_at=CURRENT_TIMESTAMP WHERE project_briefs.summary_job_id",
+])
+def test_query_is_exercised_with_index(plans, fragment):
+    matches = [(statement, plan) for statement, plan in plans if fragment in statement]
+    assert matches, f"No se ejecutó ninguna consulta con: {fragment}"
+    for statement, plan in matches:
+        assert any("USING INDEX" in step or "PRIMARY KEY" in step for step in plan), f"{statement}\n    {plan}"
@@ -0,0 +1,50 @@
+"""
+Perfil de un turno de chat emitido como SSE
+
+El turno final genera resumen y sugerencias en tareas propias y el body del
+stream lo recorre otra tarea de Starlette: el perfil tiene que incluir los
+frames de ``app/services`` que ejecutan esas tareas, no solo la espera de la
+tarea de la petición.
+"""
+
+import asyncio
+import os
+
+from benchmarks.conversation import MESSAGES
+
+async def profiled_turn(directory: str) -> str:
+    import httpx
+    from main import app
+    from app.core.profiling import ProfileStore, ProfilingMiddleware
+
+    store = ProfileStore(directory, max_files=10)
+    profiled = ProfilingMiddleware(app, store=store, header="X-Profile", sample_rate=0.0, interval=0.002)
+    body = {"session_id": "profiled_sse", "device_token": "profiled_device"}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=profiled), base_url="http://test") as client:
+            for message in MESSAGES[:-1]:
+                response = await client.post("/chat/stream", json={**body, "message": message})
+                assert response.status_code == 200
+            assert not store.recent()
+
+            response = await client.post(
+                "/chat/stream",
+                json={**body, "message": MESSAGES[-1]},
+                headers={"Accept": "text/event-stream", "X-Profile": "1"}
+            )
+            assert response.status_code == 200
+            assert "event: summary" in response.text
+
+    profiles = store.recent()
+    assert len(profiles) == 1
+    with open(store.path(profiles[0]["name"]), encoding="utf-8") as f:
+        return f.read()
+
+def test_sse_turn_profile_includes_service_frames(tmp_path):
+    folded = asyncio.run(profiled_turn(str(tmp_path)))
+    services = os.path.join("app", "services") + os.sep
+    stacks = [line for line in folded.splitlines() if services in line]
+    assert stacks, folded
+    assert any("_stream_summary" in line for line in stacks), folded
+    # La espera al proveedor ocurre en la tarea que wait_for crea para cada token
+    assert any("llm_router.py" in line for line in stacks), folded